@@ -0,0 +1,342 @@
+# Precomputed analytics for the Home page.
+#
+# The Home charts are Vega-Lite specs precomputed for every combination of the
+# Home filters (risk level, age band, cycle number, country, gender). They are
+# built from the grouped counts that ingestion.py maintains incrementally,
+# never from the raw rows: the counts are rolled up over each subset of the
+# filters and a chart spec is stored per cell. The cube is cached in memory and
+# on disk, keyed by the store version, so a Home page load or a filter change
+# is a dictionary lookup and matplotlib is never imported.
+#
+# Run `python analytics.py` after updating a dataset to ingest it and warm the
+# disk cache.
+import hashlib
+import itertools
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import ingestion
+from model_registry import BASE_DIR
+
+CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'analytics')
+
+# Bump when the aggregates or specs change shape so old cache files are ignored
+ANALYTICS_VERSION = 3
+
+MATERNAL_FACTORS = ['Age', 'SystolicBP', 'DiastolicBP', 'BS', 'BodyTemp', 'HeartRate']
+
+# Filter values offered by the explorer; 'All' matches every row
+ALL = 'All'
+# Rows whose filter value is missing or outside every option (survey ages like -29 or
+# 329); they count towards 'All' but are never offered as a choice
+UNKNOWN = 'Unknown'
+RISK_LEVELS = {'High Risk': 'high risk', 'Mid Risk': 'mid risk', 'Low Risk': 'low risk'}
+AGE_BANDS = [(10, 20, '10-19'), (20, 30, '20-29'), (30, 40, '30-39'), (40, 50, '40-49'), (50, 101, '50+')]
+MAX_CYCLE_FILTER = 10
+GENDERS = {'Women': 'Female', 'Everyone': ALL}
+
+_memory_cache = {}
+_lock = threading.Lock()
+
+
+def weighted_percentile(values, counts, q):
+    # np.percentile's default (linear) method on the expanded data, without expanding it
+    cumulative = np.cumsum(counts)
+    position = q / 100 * (cumulative[-1] - 1)
+    lower = np.floor(position).astype(int)
+    upper = np.ceil(position).astype(int)
+    low_values = values[np.searchsorted(cumulative, lower, side='right')]
+    high_values = values[np.searchsorted(cumulative, upper, side='right')]
+    return low_values + (position - lower) * (high_values - low_values)
+
+
+def box_stats(values, counts):
+    # Same statistics as a seaborn/matplotlib boxplot: quartiles and 1.5 IQR whiskers
+    if len(values) == 0:
+        return None
+    q1, median, q3 = weighted_percentile(values, counts, np.array([25, 50, 75]))
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    return {
+        'q1': float(q1),
+        'median': float(median),
+        'q3': float(q3),
+        'whisker_low': float(inside.min()),
+        'whisker_high': float(inside.max()),
+        'outliers': [float(v) for v in outliers],
+    }
+
+
+def histogram_with_kde(values, counts, bins=20, grid_size=200):
+    hist, edges = np.histogram(values, bins=bins, weights=counts)
+    result = {
+        'bins': [{'start': float(edges[i]), 'end': float(edges[i + 1]), 'count': int(hist[i])}
+                 for i in range(len(hist))],
+        'kde': [],
+    }
+    # Gaussian KDE with Scott's bandwidth, scaled to counts like seaborn's histplot(kde=True)
+    n = counts.sum()
+    if n > 1:
+        mean = (values * counts).sum() / n
+        std = np.sqrt((counts * (values - mean) ** 2).sum() / (n - 1))
+    else:
+        std = 0.0
+    if n > 1 and std > 0:
+        bandwidth = std * n ** (-1 / 5)
+        grid = np.linspace(values.min(), values.max(), grid_size)
+        # One kernel per distinct value, weighted by its count
+        density = (counts[:, None] * np.exp(-0.5 * ((grid[None, :] - values[:, None]) / bandwidth) ** 2)).sum(axis=0)
+        density /= n * bandwidth * np.sqrt(2 * np.pi)
+        scale = n * (edges[1] - edges[0])
+        result['kde'] = [{'x': float(x), 'y': float(y)} for x, y in zip(grid, density * scale)]
+    return result
+
+
+def maternal_box_spec(rows, title='Distribution of Factors Contributing to High-Risk Maternal Health'):
+    encoding_x = {'field': 'factor', 'type': 'nominal', 'sort': MATERNAL_FACTORS, 'title': None}
+    color = {'field': 'factor', 'type': 'nominal', 'sort': MATERNAL_FACTORS,
+             'scale': {'scheme': 'viridis'}, 'legend': None}
+    outliers = [{'factor': row['factor'], 'value': value} for row in rows for value in row['outliers']]
+    return {
+        '$schema': 'https://vega.github.io/schema/vega-lite/v5.json',
+        'title': title,
+        'height': 360,
+        'layer': [
+            {
+                'data': {'values': rows},
+                'mark': {'type': 'rule'},
+                'encoding': {'x': encoding_x,
+                             'y': {'field': 'whisker_low', 'type': 'quantitative', 'title': 'Value'},
+                             'y2': {'field': 'whisker_high'}},
+            },
+            {
+                'data': {'values': rows},
+                'mark': {'type': 'bar', 'size': 40},
+                'encoding': {'x': encoding_x, 'y': {'field': 'q1', 'type': 'quantitative'},
+                             'y2': {'field': 'q3'}, 'color': color},
+            },
+            {
+                'data': {'values': rows},
+                'mark': {'type': 'tick', 'size': 40, 'color': 'white', 'thickness': 2},
+                'encoding': {'x': encoding_x, 'y': {'field': 'median', 'type': 'quantitative'}},
+            },
+            {
+                'data': {'values': outliers},
+                'mark': {'type': 'point', 'color': 'gray'},
+                'encoding': {'x': encoding_x, 'y': {'field': 'value', 'type': 'quantitative'}},
+            },
+        ],
+    }
+
+
+def histogram_spec(hist, column, title, x_title):
+    return {
+        '$schema': 'https://vega.github.io/schema/vega-lite/v5.json',
+        'title': title,
+        'height': 360,
+        'layer': [
+            {
+                'data': {'values': hist['bins']},
+                'mark': {'type': 'bar', 'color': 'purple', 'opacity': 0.6},
+                'encoding': {
+                    'x': {'field': 'start', 'type': 'quantitative', 'title': x_title},
+                    'x2': {'field': 'end'},
+                    'y': {'field': 'count', 'type': 'quantitative', 'title': 'Frequency'},
+                    'tooltip': [{'field': 'start', 'title': column}, {'field': 'count'}],
+                },
+            },
+            {
+                'data': {'values': hist['kde']},
+                'mark': {'type': 'line', 'color': 'purple'},
+                'encoding': {'x': {'field': 'x', 'type': 'quantitative'},
+                             'y': {'field': 'y', 'type': 'quantitative'}},
+            },
+        ],
+    }
+
+
+def treatment_spec(rows, title='Women Seeking Mental Health Treatment'):
+    return {
+        '$schema': 'https://vega.github.io/schema/vega-lite/v5.json',
+        'title': title,
+        'data': {'values': rows},
+        'mark': {'type': 'bar'},
+        'encoding': {
+            'x': {'field': 'treatment', 'type': 'nominal', 'title': 'Sought Treatment', 'axis': {'labelAngle': 0}},
+            'y': {'field': 'count', 'type': 'quantitative', 'title': 'Count'},
+            'color': {'field': 'treatment', 'type': 'nominal', 'scale': {'scheme': 'blueorange'}, 'legend': None},
+        },
+    }
+
+
+def age_bands(ages):
+    # Band label per age; ages outside every band (typos in the survey) get None
+    ages = pd.to_numeric(ages, errors='coerce')
+    labels = pd.Series(None, index=ages.index, dtype=object)
+    for low, high, label in AGE_BANDS:
+        labels[(ages >= low) & (ages < high)] = label
+    return labels
+
+
+def _rollup(frame, dims, measure):
+    """Value counts of measure for every combination of filter values.
+
+    frame holds grouped rows (dims, measure, n). Each subset of dims is also
+    rolled up to 'All', so every cell a user can select has an entry, keyed
+    by the filter values joined with '|'. Missing filter values roll up to
+    'All' too; their own cells are left out.
+    """
+    frame = frame.dropna(subset=[measure]).fillna({d: UNKNOWN for d in dims})
+    parts = [frame.assign(**{d: ALL for d in rolled})
+             for k in range(len(dims) + 1) for rolled in itertools.combinations(dims, k)]
+    cube = pd.concat(parts).groupby(dims + [measure])['n'].sum()
+    cells = {}
+    for key, series in cube.groupby(level=list(range(len(dims)))):
+        key = key if isinstance(key, tuple) else (key,)
+        if UNKNOWN in key:
+            continue
+        cells['|'.join(str(k) for k in key)] = (series.index.get_level_values(-1).to_numpy(dtype=float),
+                                                series.to_numpy())
+    return cells
+
+
+def _filter_title(parts):
+    chosen = [p for p in parts if p]
+    return f" ({', '.join(chosen)})" if chosen else ''
+
+
+def compute_explorer_cube(conn):
+    cube = {}
+    band_options = [ALL] + [label for _, _, label in AGE_BANDS]
+
+    # Maternal factors by risk level and age band
+    maternal = ingestion.group_counts(conn, 'maternal')
+    names = {v: k for k, v in RISK_LEVELS.items()}
+    maternal['risk'] = maternal['RiskLevel'].map(names)
+    maternal['age_band'] = age_bands(maternal['Age'])
+    rows = {}
+    for factor in MATERNAL_FACTORS:
+        for key, (values, counts) in _rollup(maternal, ['risk', 'age_band'], factor).items():
+            rows.setdefault(key, []).append(dict(factor=factor, **box_stats(values, counts)))
+    cube['maternal'] = {}
+    for key, cell in rows.items():
+        risk, band = key.split('|')
+        title = 'Distribution of Maternal Health Factors' + _filter_title(
+            [risk if risk != ALL else 'all risk levels', f'ages {band}' if band != ALL else ''])
+        cube['maternal'][key] = maternal_box_spec(cell, title)
+
+    # Cycle lengths by age band and cycle number
+    menstrual = ingestion.group_counts(conn, 'menstrual').dropna(subset=['cycle_length'])
+    menstrual['age_band'] = age_bands(menstrual['age'])
+    menstrual['cycle'] = np.where(menstrual['cycle_number'] > MAX_CYCLE_FILTER, f'{MAX_CYCLE_FILTER + 1}+',
+                                  menstrual['cycle_number'].astype(str))
+    cube['menstrual'] = {}
+    for key, (values, counts) in _rollup(menstrual, ['age_band', 'cycle'], 'cycle_length').items():
+        band, cycle = key.split('|')
+        title = 'Distribution of Menstrual Cycle Lengths' + _filter_title(
+            [f'ages {band}' if band != ALL else '', f'cycle {cycle}' if cycle != ALL else ''])
+        cube['menstrual'][key] = histogram_spec(histogram_with_kde(values, counts), 'cycle_length', title,
+                                                'Cycle Length (Days)')
+
+    # Treatment by country, age band and gender
+    survey = ingestion.group_counts(conn, 'survey')
+    survey['country'] = survey['Country'].str.strip()
+    survey['age_band'] = age_bands(survey['Age'])
+    # Same definition of women as the original Home chart
+    survey['gender'] = np.where(survey['Gender'] == GENDERS['Women'], 'Women', 'Other')
+    survey['treatment_code'] = survey['treatment'].map({'No': 0.0, 'Yes': 1.0})
+    cube['survey'] = {}
+    for key, (values, counts) in _rollup(survey, ['country', 'age_band', 'gender'], 'treatment_code').items():
+        country, band, gender = key.split('|')
+        if gender == 'Other':
+            continue
+        gender = 'Everyone' if gender == ALL else gender
+        rows = [{'treatment': 'Yes' if v else 'No', 'count': int(c)} for v, c in zip(values, counts)]
+        who = 'Women' if gender == 'Women' else 'Respondents'
+        title = f'{who} Seeking Mental Health Treatment' + _filter_title(
+            [country if country != ALL else '', f'ages {band}' if band != ALL else ''])
+        cube['survey'][f'{country}|{band}|{gender}'] = treatment_spec(rows, title)
+
+    countries = survey.groupby('country')['n'].sum().sort_values(ascending=False, kind='stable')
+    cube['options'] = {
+        'risk': list(RISK_LEVELS) + [ALL],
+        'age_band': band_options,
+        'cycle': [ALL] + [str(i) for i in range(1, MAX_CYCLE_FILTER + 1)] + [f'{MAX_CYCLE_FILTER + 1}+'],
+        'country': [ALL] + list(countries.index),
+        'gender': list(GENDERS),
+    }
+    return cube
+
+
+def explorer_chart(cube, dataset, *filters):
+    # None when no record matches the filters
+    return cube[dataset].get('|'.join(filters))
+
+
+def home_cache_key(version):
+    return hashlib.sha256(f'{ANALYTICS_VERSION}:{version}'.encode()).hexdigest()[:32]
+
+
+def _cache_path(key):
+    return os.path.join(CACHE_DIR, f'explorer-{key}.json')
+
+
+def _write_cache(key, value):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = _cache_path(key) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(value, f)
+    os.replace(tmp_path, _cache_path(key))
+
+
+def _compute_cube():
+    conn = ingestion.connect()
+    try:
+        return compute_explorer_cube(conn)
+    finally:
+        conn.close()
+
+
+def precompute_explorer_cube():
+    key = home_cache_key(ingestion.refresh())
+    value = _compute_cube()
+    _write_cache(key, value)
+    with _lock:
+        _memory_cache['explorer'] = (key, value)
+    return key, value
+
+
+def get_explorer_cube():
+    # refresh() only touches the store when a CSV changed since the last call
+    key = home_cache_key(ingestion.refresh())
+    cached = _memory_cache.get('explorer')
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with _lock:
+        cached = _memory_cache.get('explorer')
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        try:
+            with open(_cache_path(key)) as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            value = None
+        if value is None:
+            value = _compute_cube()
+            try:
+                _write_cache(key, value)
+            except OSError:
+                pass  # read-only deployments still get the in-memory cache
+        # Only one store version is kept in memory
+        _memory_cache['explorer'] = (key, value)
+        return value
+
+
+if __name__ == '__main__':
+    key, _ = precompute_explorer_cube()
+    print(f'Wrote {_cache_path(key)}')
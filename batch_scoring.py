@@ -0,0 +1,109 @@
+# Batch scoring for the maternal health risk model.
+#
+# Scores a CSV or DataFrame shaped like 'Maternal Health Risk Data Set.csv' in
+# chunks: columns are validated once, each chunk goes through a single
+# predict_proba call, and scored chunks are yielded as soon as they are ready.
+#
+# Command line:
+#   python batch_scoring.py screenings.csv -o scored.csv --chunksize 50000
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from model_registry import get_model
+from predictors import MATERNAL_FEATURES, RISK_LEVELS, get_maternal_recommendation
+
+DEFAULT_CHUNKSIZE = 10000
+
+
+def validate_maternal_columns(columns):
+    missing = [c for c in MATERNAL_FEATURES if c not in columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+
+def iter_chunks(source, chunksize):
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+    else:
+        # Paths and file-like objects (e.g. a Streamlit upload) are read lazily
+        for chunk in pd.read_csv(source, chunksize=chunksize):
+            yield chunk
+
+
+def score_maternal_chunk(chunk, model=None):
+    model = model if model is not None else get_model('maternal', compiled=False)
+    features = chunk[MATERNAL_FEATURES].apply(pd.to_numeric, errors='coerce')
+    valid = features.notna().all(axis=1).to_numpy()
+
+    scored = chunk.copy()
+    labels = np.full(len(chunk), 'Invalid input', dtype=object)
+    probabilities = np.full((len(chunk), len(model.classes_)), np.nan)
+    if valid.any():
+        probabilities[valid] = model.predict_proba(features[valid])
+        # Same rule as RandomForestClassifier.predict: the most probable class
+        predicted = model.classes_.take(np.argmax(probabilities[valid], axis=1))
+        labels[valid] = [RISK_LEVELS[p] for p in predicted]
+
+    scored['PredictedRiskLevel'] = labels
+    for i, cls in enumerate(model.classes_):
+        scored[f'P({RISK_LEVELS[cls]})'] = probabilities[:, i]
+    recommendations = {level: get_maternal_recommendation(level) for level in RISK_LEVELS.values()}
+    scored['Recommendation'] = pd.Series(labels, index=chunk.index).map(recommendations).fillna('')
+    return scored
+
+
+def score_maternal_batch(source, chunksize=DEFAULT_CHUNKSIZE, stats=None):
+    """Yield scored DataFrames chunk by chunk.
+
+    If a dict is passed as stats it is updated with rows, invalid_rows,
+    seconds and rows_per_second as the chunks are produced.
+    """
+    model = get_model('maternal', compiled=False)
+    stats = stats if stats is not None else {}
+    stats.update(rows=0, invalid_rows=0, seconds=0.0, rows_per_second=0.0)
+    start = time.perf_counter()
+    checked = False
+    for chunk in iter_chunks(source, chunksize):
+        if not checked:
+            chunk.columns = [str(c).strip() for c in chunk.columns]
+            validate_maternal_columns(chunk.columns)
+            columns = chunk.columns
+            checked = True
+        else:
+            chunk.columns = columns
+        scored = score_maternal_chunk(chunk, model)
+        stats['rows'] += len(scored)
+        stats['invalid_rows'] += int((scored['PredictedRiskLevel'] == 'Invalid input').sum())
+        stats['seconds'] = time.perf_counter() - start
+        stats['rows_per_second'] = stats['rows'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+        yield scored
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score maternal health screening records in bulk.")
+    parser.add_argument('input', help="CSV with the columns of 'Maternal Health Risk Data Set.csv'")
+    parser.add_argument('-o', '--output', help="output CSV (default: stdout)")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    stats = {}
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        header = True
+        for scored in score_maternal_batch(args.input, args.chunksize, stats):
+            scored.to_csv(out, header=header, index=False)
+            header = False
+    finally:
+        if args.output:
+            out.close()
+    print(f"Scored {stats['rows']} rows ({stats['invalid_rows']} invalid) in {stats['seconds']:.2f}s "
+          f"- {stats['rows_per_second']:.0f} rows/second", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
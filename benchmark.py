@@ -0,0 +1,360 @@
+# Benchmark harness for the dashboard.
+#
+# Measures, in separate sections:
+#   imports     cold import time of the heavy libraries, each in a fresh interpreter
+#   startup     cold start of app_new.py straight into each page, and which libraries it loaded
+#   pages       per-page rerun latency using Streamlit's AppTest runner
+#   models      single-row latency and batched throughput of the four models
+#   saturation  p50/p99 prediction latency as concurrent sessions grow, inline vs the inference executor
+#
+# Results are written as JSON (with the git commit) so runs can be compared:
+#   python benchmark.py                          # all sections -> bench_results/<commit>.json
+#   python benchmark.py pages models -o run.json
+#   python benchmark.py --compare old.json new.json
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(BASE_DIR, 'app_new.py')
+RESULTS_DIR = os.path.join(BASE_DIR, 'bench_results')
+
+PAGES = ["Home", "Maternal Health", "Menstrual Cycle", "Mental Well-being", "BMI Calculator",
+         "Hydration Tracker", "Batch Risk Scoring"]
+
+# Import name for each library we track
+LIBRARIES = {
+    'streamlit': 'streamlit',
+    'pandas': 'pandas',
+    'matplotlib': 'matplotlib.pyplot',
+    'seaborn': 'seaborn',
+    'sklearn': 'sklearn.ensemble',
+}
+
+SECTIONS = ['imports', 'startup', 'pages', 'models', 'saturation']
+
+
+def _run_python(code, timeout=300):
+    result = subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, capture_output=True, text=True,
+                            timeout=timeout, env=dict(os.environ, PYTHONWARNINGS='ignore'))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _summary(samples):
+    samples = sorted(samples)
+    return {
+        'n': len(samples),
+        'min_ms': round(samples[0] * 1e3, 3),
+        'median_ms': round(statistics.median(samples) * 1e3, 3),
+        'p90_ms': round(samples[int(0.9 * (len(samples) - 1))] * 1e3, 3),
+        'max_ms': round(samples[-1] * 1e3, 3),
+    }
+
+
+def bench_imports(repeat=3):
+    results = {}
+    for name, module in LIBRARIES.items():
+        code = ("import json, time\n"
+                "start = time.perf_counter()\n"
+                f"import {module}\n"
+                "print(json.dumps(time.perf_counter() - start))")
+        try:
+            samples = [_run_python(code) for _ in range(repeat)]
+        except RuntimeError as e:
+            results[name] = {'error': str(e)}
+            continue
+        results[name] = _summary(samples)
+    return results
+
+
+_STARTUP_CODE = """
+import json, logging, sys, time, warnings
+warnings.filterwarnings('ignore')
+logging.disable(logging.CRITICAL)
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=300)
+at.query_params['page'] = {page!r}
+at.run()
+finished = time.perf_counter()
+print(json.dumps({{
+    'streamlit_import_ms': (imported - start) * 1e3,
+    'first_run_ms': (finished - imported) * 1e3,
+    'total_ms': (finished - start) * 1e3,
+    'exceptions': [str(e.value) for e in at.exception],
+    'loaded': {{name: module in sys.modules for name, module in {libraries!r}.items()}},
+}}))
+"""
+
+
+def startup_code(page='Home'):
+    # The page is opened through the ?page= query parameter, so Home is never rendered first
+    return _STARTUP_CODE.format(app=APP_PATH, page=page, libraries=LIBRARIES)
+
+
+def bench_startup(repeat=3):
+    # Cold start straight into each page, and the heavy libraries that page pulled in
+    results = {}
+    for page in PAGES:
+        runs = [_run_python(startup_code(page)) for _ in range(repeat)]
+        best = min(runs, key=lambda r: r['total_ms'])
+        results[page] = {
+            'streamlit_import_ms': round(best['streamlit_import_ms'], 1),
+            'first_run_ms': round(best['first_run_ms'], 1),
+            'total_ms': round(best['total_ms'], 1),
+            'libraries_loaded': best['loaded'],
+            'exceptions': best['exceptions'],
+        }
+    return results
+
+
+def startup_report(results):
+    names = list(LIBRARIES)
+    lines = [f"{'page':20s} {'cold start ms':>14s}  " + ' '.join(f'{n:>10s}' for n in names)]
+    for page, r in results.items():
+        loaded = ' '.join(f"{'yes' if r['libraries_loaded'][n] else '-':>10s}" for n in names)
+        lines.append(f"{page:20s} {r['total_ms']:14.1f}  {loaded}")
+    return '\n'.join(lines)
+
+
+def bench_pages(repeat=10):
+    import logging
+    import warnings
+    warnings.filterwarnings('ignore')
+    logging.disable(logging.CRITICAL)
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    for page in PAGES:
+        at = AppTest.from_file(APP_PATH, default_timeout=300)
+        at.run()
+        start = time.perf_counter()
+        at.sidebar.radio[0].set_value(page).run()
+        first_visit = time.perf_counter() - start
+        reruns = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            at.run()
+            reruns.append(time.perf_counter() - start)
+        result = {'first_visit_ms': round(first_visit * 1e3, 3), 'rerun': _summary(reruns),
+                  'exceptions': [str(e.value) for e in at.exception]}
+        # Pages with a primary action (Predict, Calculate BMI, ...) get it timed as well
+        if len(at.button):
+            clicks = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                at.button[0].click().run()
+                clicks.append(time.perf_counter() - start)
+            result['button'] = at.button[0].label
+            result['button_rerun'] = _summary(clicks)
+        results[page] = result
+    return results
+
+
+def _model_inputs(n_rows, seed=0):
+    import numpy as np
+    import pandas as pd
+    from predictors import MATERNAL_FEATURES, MENSTRUAL_FEATURES, MENTAL_HEALTH_FEATURES
+    rng = np.random.default_rng(seed)
+    maternal = pd.DataFrame({
+        'Age': rng.integers(10, 51, n_rows), 'SystolicBP': rng.integers(50, 201, n_rows),
+        'DiastolicBP': rng.integers(30, 151, n_rows), 'BS': np.round(rng.uniform(2, 20, n_rows), 1),
+        'BodyTemp': np.round(rng.uniform(80, 120, n_rows), 1), 'HeartRate': rng.integers(50, 151, n_rows),
+    })[MATERNAL_FEATURES]
+    menstrual = pd.DataFrame({
+        'age': rng.integers(10, 51, n_rows), 'cycle_number': rng.integers(1, 13, n_rows),
+        'cycle_length': rng.integers(20, 41, n_rows), 'cycle_start_day': rng.integers(1, 29, n_rows),
+        'cycle_start_month': rng.integers(1, 13, n_rows), 'cycle_start_year': rng.integers(2000, 2031, n_rows),
+    })[MENSTRUAL_FEATURES]
+    mental = pd.DataFrame({c: rng.integers(0, 2, n_rows) for c in MENTAL_HEALTH_FEATURES})
+    mental['Age'] = rng.integers(10, 101, n_rows)
+    return {'maternal': maternal, 'regularity': menstrual, 'ovulation': menstrual, 'mental': mental}
+
+
+def bench_models(repeat=50, batch_size=10000):
+    import warnings
+    warnings.filterwarnings('ignore')
+    from model_registry import get_model
+
+    inputs = _model_inputs(batch_size)
+    results = {}
+    for name, X in inputs.items():
+        backends = {'sklearn': get_model(name, compiled=False)}
+        compiled = get_model(name)
+        if compiled is not backends['sklearn']:
+            backends['compiled'] = compiled
+        results[name] = {}
+        for backend, model in backends.items():
+            row = X.iloc[:1]
+            model.predict(row)
+            single = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                model.predict(row)
+                single.append(time.perf_counter() - start)
+            batch = []
+            for _ in range(3):
+                start = time.perf_counter()
+                model.predict(X)
+                batch.append(time.perf_counter() - start)
+            results[name][backend] = {
+                'single_row': _summary(single),
+                'single_row_per_second': round(1 / statistics.median(single), 1),
+                'batch_size': batch_size,
+                'batch_rows_per_second': round(batch_size / min(batch), 1),
+            }
+    return results
+
+
+def _percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def _saturate(predict, rows, sessions, requests_per_session):
+    # Each session is a thread making requests one after another, like a Streamlit script thread
+    import threading
+    latencies = [[] for _ in range(sessions)]
+
+    def session(i):
+        for j in range(requests_per_session):
+            row = rows[(i * requests_per_session + j) % len(rows)]
+            start = time.perf_counter()
+            predict(row)
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    samples = [s for per_session in latencies for s in per_session]
+    return {
+        'p50_ms': round(_percentile(samples, 0.5) * 1e3, 3),
+        'p99_ms': round(_percentile(samples, 0.99) * 1e3, 3),
+        'requests_per_second': round(len(samples) / elapsed, 1),
+    }
+
+
+def bench_saturation(sessions=(1, 2, 4, 8, 16, 32), requests_per_session=50):
+    import warnings
+    warnings.filterwarnings('ignore')
+    import predictors
+    from inference_executor import InferenceExecutor
+
+    # Distinct rows, so neither path is answered from the prediction cache
+    rows = _model_inputs(max(sessions) * requests_per_session)['maternal'].values.tolist()
+    executor = InferenceExecutor()
+    try:
+        executor.submit('maternal', rows[0]).result()
+        backends = {
+            'inline': lambda row: predictors._predict_risk_uncached([row]),
+            'executor': lambda row: executor.submit('maternal', row).result(),
+        }
+        results = {'workers': executor.workers}
+        for backend, predict in backends.items():
+            predictors.PREDICTION_CACHES['maternal'].clear()
+            results[backend] = {str(n): _saturate(predict, rows, n, requests_per_session) for n in sessions}
+    finally:
+        executor.shutdown()
+    return results
+
+
+def saturation_report(results):
+    lines = [f"{'sessions':>8s} {'inline p50':>11s} {'p99':>9s} {'req/s':>9s}   "
+             f"{'executor p50':>12s} {'p99':>9s} {'req/s':>9s}"]
+    for n in results['inline']:
+        a, b = results['inline'][n], results['executor'][n]
+        lines.append(f"{n:>8s} {a['p50_ms']:11.2f} {a['p99_ms']:9.2f} {a['requests_per_second']:9.1f}   "
+                     f"{b['p50_ms']:12.2f} {b['p99_ms']:9.2f} {b['requests_per_second']:9.1f}")
+    return '\n'.join(lines)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sections=SECTIONS):
+    results = {
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+    benches = {'imports': bench_imports, 'startup': bench_startup, 'pages': bench_pages, 'models': bench_models,
+               'saturation': bench_saturation}
+    for section in sections:
+        print(f"Running {section}...", file=sys.stderr)
+        results[section] = benches[section]()
+        if section == 'startup':
+            print(startup_report(results[section]), file=sys.stderr)
+        if section == 'saturation':
+            print(saturation_report(results[section]), file=sys.stderr)
+    return results
+
+
+def _flatten(data, prefix=''):
+    flat = {}
+    for key, value in data.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = _flatten(json.load(f))
+    with open(new_path) as f:
+        new = _flatten(json.load(f))
+    for key in sorted(set(old) & set(new)):
+        if not (key.endswith('_ms') or key.endswith('per_second')) or not old[key]:
+            continue
+        change = (new[key] - old[key]) / old[key] * 100
+        # Latencies should go down, throughputs up
+        worse = change > 0 if key.endswith('_ms') else change < 0
+        flag = '  <-- regression' if worse and abs(change) >= 10 else ''
+        print(f"{key:70s} {old[key]:12.3f} {new[key]:12.3f} {change:+7.1f}%{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark startup, page reruns and model throughput.")
+    parser.add_argument('sections', nargs='*', help="any of: " + ', '.join(SECTIONS) + " (default: all)")
+    parser.add_argument('-o', '--output', help="JSON file to write (default: bench_results/<commit>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="compare two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    unknown = [s for s in args.sections if s not in SECTIONS]
+    if unknown:
+        parser.error(f"unknown section(s): {', '.join(unknown)}")
+    results = run(args.sections or SECTIONS)
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['commit'] or 'results'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
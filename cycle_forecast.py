@@ -0,0 +1,259 @@
+# Per-user menstrual cycle history and a vectorised multi-cycle forecaster.
+#
+# Logged cycles live in the user_cycles table of the local SQLite store. The
+# forecaster takes the histories of any number of users, derives each user's
+# real cycle index and a rolling mean of their recent cycle lengths, and builds
+# the feature rows for the latest cycle plus the next N cycles of every user at
+# once. model_regularity and model_ovulation are each called once per run.
+#
+# Nightly job over the whole user base (or the bundled dataset):
+#   python cycle_forecast.py --cycles 6 -o forecasts.csv
+#   python cycle_forecast.py --source dataset --cycles 6
+import argparse
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import ingestion
+from model_registry import get_model
+from predictors import MENSTRUAL_FEATURES
+
+# Cycles averaged for the expected length of the next cycles
+ROLLING_WINDOW = 3
+
+# Used when a user has no cycle with a known length yet
+DEFAULT_CYCLE_LENGTH = 28
+
+# Above this many rows sklearn is faster than the compiled forest
+COMPILED_MAX_ROWS = 2000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_cycles (
+    user_id TEXT NOT NULL, cycle_start_date TEXT NOT NULL, cycle_length INTEGER, age INTEGER,
+    logged_at TEXT, PRIMARY KEY (user_id, cycle_start_date)
+);
+CREATE TABLE IF NOT EXISTS cycle_forecasts (
+    user_id TEXT NOT NULL, step INTEGER NOT NULL, cycle_number INTEGER, cycle_start_date TEXT,
+    cycle_length INTEGER, regular INTEGER, ovulation_date TEXT, next_cycle_date TEXT, generated_at TEXT,
+    PRIMARY KEY (user_id, step)
+);
+"""
+
+
+def connect(path=ingestion.STORE_PATH):
+    conn = ingestion.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def log_cycle(user_id, cycle_start_date, age, cycle_length=None, path=ingestion.STORE_PATH):
+    conn = connect(path)
+    try:
+        conn.execute(
+            'INSERT OR REPLACE INTO user_cycles (user_id, cycle_start_date, cycle_length, age, logged_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (str(user_id), cycle_start_date.strftime('%Y-%m-%d'), None if cycle_length is None else int(cycle_length),
+             int(age), datetime.now().isoformat(timespec='seconds')))
+    finally:
+        conn.close()
+
+
+def delete_cycle(user_id, cycle_start_date, path=ingestion.STORE_PATH):
+    conn = connect(path)
+    try:
+        conn.execute('DELETE FROM user_cycles WHERE user_id = ? AND cycle_start_date = ?',
+                     (str(user_id), cycle_start_date.strftime('%Y-%m-%d')))
+    finally:
+        conn.close()
+
+
+def _parse_history(frame):
+    frame['cycle_start_date'] = pd.to_datetime(frame['cycle_start_date'])
+    frame['cycle_length'] = frame['cycle_length'].astype('float64')
+    return frame
+
+
+def user_history(user_ids=None, path=ingestion.STORE_PATH):
+    conn = connect(path)
+    try:
+        query = 'SELECT user_id, cycle_start_date, cycle_length, age FROM user_cycles'
+        params = ()
+        if user_ids is not None:
+            user_ids = [str(u) for u in user_ids]
+            query += f' WHERE user_id IN ({", ".join("?" for _ in user_ids)})'
+            params = tuple(user_ids)
+        return _parse_history(pd.read_sql_query(query + ' ORDER BY user_id, cycle_start_date', conn,
+                                                params=params))
+    finally:
+        conn.close()
+
+
+def dataset_history(path=ingestion.STORE_PATH):
+    # Cycle histories of the bundled dataset, one user per new_id
+    ingestion.refresh(path)
+    frame = ingestion.read_table('menstrual', ['new_id', 'cycle_start_date', 'cycle_length', 'age'], path=path)
+    frame = frame.rename(columns={'new_id': 'user_id'})
+    frame['user_id'] = frame['user_id'].astype(str)
+    return _parse_history(frame)
+
+
+def _usable_history(history):
+    # Rows without a start date cannot be placed; a missing age is taken from the
+    # user's nearest other cycle. Returns the usable rows and the users left out.
+    h = history.copy()
+    h['cycle_start_date'] = pd.to_datetime(h['cycle_start_date'], errors='coerce')
+    for column in ('age', 'cycle_length'):
+        h[column] = pd.to_numeric(h[column], errors='coerce').astype('float64').replace([np.inf, -np.inf], np.nan)
+    h = h.dropna(subset=['cycle_start_date'])
+    h = h.sort_values(['user_id', 'cycle_start_date'], kind='stable').reset_index(drop=True)
+    ages = h.groupby('user_id', sort=False)['age']
+    h['age'] = h['age'].fillna(ages.ffill()).fillna(ages.bfill())
+    usable = h['age'].notna()
+    all_users = pd.unique(history['user_id'])
+    skipped = sorted(set(all_users) - set(h.loc[usable, 'user_id']), key=str)
+    return h[usable].reset_index(drop=True), skipped
+
+
+PLAN_COLUMNS = ['user_id', 'step', 'cycle_number', 'cycle_start_date', 'cycle_length'] + [
+    c for c in MENSTRUAL_FEATURES if c not in ('cycle_number', 'cycle_length')]
+
+
+def plan_cycles(history, n_cycles=3, window=ROLLING_WINDOW, stats=None):
+    """Feature rows for every user's latest logged cycle (step 0) and the next n_cycles.
+
+    history has one row per logged cycle: user_id, cycle_start_date, age and
+    cycle_length (may be missing; it is then taken from the next start date).
+    Users with no start date or no age on any cycle are left out. If a dict is
+    passed as stats it is updated with users and skipped_users. No model is
+    called: the MENSTRUAL_FEATURES columns are ready to score.
+    """
+    h, skipped = _usable_history(history)
+    if stats is not None:
+        stats.update(users=h['user_id'].nunique(), skipped_users=skipped)
+    if h.empty:
+        return pd.DataFrame(columns=PLAN_COLUMNS)
+    users = h.groupby('user_id', sort=False)
+
+    # Real cycle index, and lengths filled in from the gap to the next start
+    h['cycle_number'] = users.cumcount() + 1
+    gap = (users['cycle_start_date'].shift(-1) - h['cycle_start_date']).dt.days
+    h['length'] = h['cycle_length'].fillna(gap)
+
+    # Rolling mean of the last `window` known lengths per user
+    known = h.dropna(subset=['length'])
+    expected = known.groupby('user_id', sort=False).tail(window).groupby('user_id')['length'].mean()
+
+    last = users.tail(1).set_index('user_id')
+    expected = expected.reindex(last.index).fillna(DEFAULT_CYCLE_LENGTH).round().astype('int64').to_numpy()
+    current_length = last['length'].fillna(pd.Series(expected, index=last.index)).astype('int64').to_numpy()
+
+    # Steps 0..n for every user: step 0 is the latest cycle, then n forecast cycles
+    n_users, n_steps = len(last), n_cycles + 1
+    steps = np.arange(n_steps)
+    start0 = last['cycle_start_date'].to_numpy().astype('datetime64[D]')
+    offsets = np.where(steps[None, :] == 0, 0, current_length[:, None] + (steps[None, :] - 1) * expected[:, None])
+    starts = start0[:, None] + offsets.astype('timedelta64[D]')
+    lengths = np.where(steps[None, :] == 0, current_length[:, None], expected[:, None])
+    numbers = last['cycle_number'].to_numpy()[:, None] + steps[None, :]
+    ages = last['age'].to_numpy()[:, None] + offsets // 365
+
+    start_index = pd.DatetimeIndex(starts.ravel())
+    return pd.DataFrame({
+        'user_id': np.repeat(last.index.to_numpy(), n_steps),
+        'step': np.tile(steps, n_users),
+        'cycle_number': numbers.ravel(),
+        'cycle_start_date': start_index,
+        'cycle_length': lengths.ravel(),
+        'age': ages.ravel(),
+        'cycle_start_day': start_index.day,
+        'cycle_start_month': start_index.month,
+        'cycle_start_year': start_index.year,
+    }, columns=PLAN_COLUMNS)
+
+
+def forecast_cycles(history, n_cycles=3, window=ROLLING_WINDOW, stats=None):
+    """plan_cycles() scored in one pass: regularity, ovulation and next cycle date of every step."""
+    columns = ['user_id', 'step', 'cycle_number', 'cycle_start_date', 'cycle_length', 'regular',
+               'ovulation_date', 'next_cycle_date']
+    plan = plan_cycles(history, n_cycles, window, stats)
+    if plan.empty:
+        return pd.DataFrame(columns=columns)
+    features = plan[MENSTRUAL_FEATURES]
+    compiled = len(features) <= COMPILED_MAX_ROWS
+    regular = get_model('regularity', compiled=compiled).predict(features) == 1
+    ovulation_days = get_model('ovulation', compiled=compiled).predict(features)
+
+    next_index = pd.DatetimeIndex(plan['cycle_start_date'] + pd.to_timedelta(plan['cycle_length'], unit='D'))
+    # Same arithmetic as the Menstrual Cycle page: ovulation is counted back from the next cycle
+    ovulation = next_index - pd.to_timedelta(ovulation_days, unit='D')
+    return pd.DataFrame({
+        'user_id': plan['user_id'],
+        'step': plan['step'],
+        'cycle_number': plan['cycle_number'],
+        'cycle_start_date': pd.DatetimeIndex(plan['cycle_start_date']),
+        'cycle_length': plan['cycle_length'],
+        'regular': regular,
+        'ovulation_date': ovulation.normalize(),
+        'next_cycle_date': next_index,
+    }, columns=columns).reset_index(drop=True)
+
+
+def save_forecasts(forecasts, path=ingestion.STORE_PATH):
+    conn = connect(path)
+    generated_at = datetime.now().isoformat(timespec='seconds')
+    rows = forecasts.assign(
+        cycle_start_date=forecasts['cycle_start_date'].dt.strftime('%Y-%m-%d'),
+        ovulation_date=forecasts['ovulation_date'].dt.strftime('%Y-%m-%d'),
+        next_cycle_date=forecasts['next_cycle_date'].dt.strftime('%Y-%m-%d'),
+        regular=forecasts['regular'].astype(int),
+        generated_at=generated_at,
+    )
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DELETE FROM cycle_forecasts')
+        conn.executemany(
+            'INSERT INTO cycle_forecasts (user_id, step, cycle_number, cycle_start_date, cycle_length, regular, '
+            'ovulation_date, next_cycle_date, generated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            rows[['user_id', 'step', 'cycle_number', 'cycle_start_date', 'cycle_length', 'regular',
+                  'ovulation_date', 'next_cycle_date', 'generated_at']].astype(object).itertuples(index=False,
+                                                                                                   name=None))
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast the next cycles of every user in one pass.")
+    parser.add_argument('--source', choices=['users', 'dataset'], default='users',
+                        help="logged user cycles (default) or the bundled cycle dataset")
+    parser.add_argument('--cycles', type=int, default=3, help="cycles to forecast per user")
+    parser.add_argument('--window', type=int, default=ROLLING_WINDOW, help="cycles in the rolling mean")
+    parser.add_argument('-o', '--output', help="also write the forecasts to this CSV")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    history = user_history() if args.source == 'users' else dataset_history()
+    loaded = time.perf_counter()
+    stats = {}
+    forecasts = forecast_cycles(history, args.cycles, args.window, stats)
+    forecasted = time.perf_counter()
+    if args.source == 'users':
+        save_forecasts(forecasts)
+    if args.output:
+        forecasts.to_csv(args.output, index=False)
+    print(f"{stats['users']} users, {len(forecasts)} forecast rows: loaded in {loaded - start:.2f}s, "
+          f"forecast in {forecasted - loaded:.2f}s, total {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    if stats['skipped_users']:
+        skipped = stats['skipped_users']
+        print(f"Skipped {len(skipped)} users with no usable age or start date: "
+              f"{', '.join(map(str, skipped[:20]))}{' ...' if len(skipped) > 20 else ''}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
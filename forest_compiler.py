@@ -0,0 +1,287 @@
+# Compile the pickled RandomForest models into flat NumPy arrays.
+#
+# Every tree of a forest is concatenated into one set of node arrays (feature,
+# threshold, children, leaf probabilities) saved as .npy files. They are loaded
+# with memory-mapping, so worker processes share one copy of the pages, and
+# CompiledForest evaluates all trees for all rows at once with the same
+# comparisons sklearn makes, so its predictions match sklearn exactly.
+#
+#   python forest_compiler.py export   # write compiled_models/ and verify it
+#   python forest_compiler.py check    # compare compiled vs sklearn predictions
+#   python forest_compiler.py bench    # load time and latency, compiled vs pickled
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from model_registry import BASE_DIR, file_digest, model_source
+
+COMPILED_DIR = os.path.join(BASE_DIR, 'compiled_models')
+
+# Only the forests are compiled; model_ovulation is a LinearRegression
+FOREST_MODELS = ['maternal', 'regularity', 'mental']
+
+FORMAT_VERSION = 1
+ARRAYS = ['feature', 'threshold', 'children_left', 'children_right', 'leaf_proba', 'roots']
+
+
+def compiled_path(name):
+    return os.path.join(COMPILED_DIR, name)
+
+
+def flatten_forest(forest):
+    features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        nodes = np.arange(n)
+        # Leaves point at themselves, so walking a fixed number of steps is safe
+        lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        # Recent sklearn stores class fractions in tree_.value and returns them as-is;
+        # older pickles store counts, which predict_proba normalised
+        value = tree.value[:, 0, :forest.n_classes_].astype(np.float64)
+        normalizer = value.sum(axis=1, keepdims=True)
+        if not np.allclose(normalizer[is_leaf], 1.0):
+            normalizer[normalizer == 0.0] = 1.0
+            value = value / normalizer
+        probas.append(value)
+        roots.append(offset)
+        offset += n
+    if offset >= np.iinfo(np.int32).max:
+        raise ValueError("Forest is too large to compile")
+    return {
+        'feature': np.concatenate(features).astype(np.int32),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'children_left': np.concatenate(lefts).astype(np.int32),
+        'children_right': np.concatenate(rights).astype(np.int32),
+        'leaf_proba': np.concatenate(probas),
+        'roots': np.asarray(roots, dtype=np.int32),
+    }
+
+
+def _swap_in(new_dir, out_dir):
+    # A directory cannot be renamed over a non-empty one, so the old one is moved aside
+    # first. Processes with its arrays memory-mapped keep the unlinked files.
+    old_dir = None
+    if os.path.exists(out_dir):
+        old_dir = f'{out_dir}.old-{os.getpid()}'
+        os.replace(out_dir, old_dir)
+    os.replace(new_dir, out_dir)
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def export_forest(name, forest):
+    # Written to a temporary directory and swapped in whole, never over live files
+    out_dir = compiled_path(name)
+    os.makedirs(COMPILED_DIR, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f'.{name}-', dir=COMPILED_DIR)
+    try:
+        os.chmod(tmp_dir, 0o755)
+        _write_export(tmp_dir, name, forest)
+        _swap_in(tmp_dir, out_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return out_dir
+
+
+def _write_export(out_dir, name, forest):
+    arrays = flatten_forest(forest)
+    for array_name, array in arrays.items():
+        np.save(os.path.join(out_dir, array_name + '.npy'), np.ascontiguousarray(array))
+    classes = forest.classes_
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'source': os.path.relpath(model_source(name), BASE_DIR),
+        'source_sha256': file_digest(model_source(name)),
+        'n_trees': len(forest.estimators_),
+        'n_nodes': int(len(arrays['feature'])),
+        'max_depth': int(max(e.tree_.max_depth for e in forest.estimators_)),
+        'n_features': int(forest.n_features_in_),
+        'feature_names': [str(f) for f in getattr(forest, 'feature_names_in_', [])],
+        'classes': classes.tolist(),
+        'classes_dtype': classes.dtype.str,
+    }
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+class CompiledForest:
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        for array_name in ARRAYS:
+            setattr(self, array_name, arrays[array_name])
+        self.max_depth = meta['max_depth']
+        self.n_features_in_ = meta['n_features']
+        self.n_trees = meta['n_trees']
+        self.classes_ = np.asarray(meta['classes'], dtype=np.dtype(meta['classes_dtype']))
+        if meta['feature_names']:
+            self.feature_names_in_ = np.asarray(meta['feature_names'], dtype=object)
+
+    def _to_array(self, X):
+        if hasattr(X, 'columns') and hasattr(self, 'feature_names_in_'):
+            X = X[list(self.feature_names_in_)]
+        # sklearn casts inputs to float32 before comparing them with the float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got shape {X.shape}")
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity")
+        return X.astype(np.float64)
+
+    def apply(self, X):
+        X = self._to_array(X)
+        n_rows = len(X)
+        # One (row, tree) pair per entry; pairs drop out once they reach a leaf
+        nodes = np.tile(self.roots, n_rows)
+        offsets = np.repeat(np.arange(n_rows) * self.n_features_in_, self.n_trees)
+        X = X.ravel()
+        active = np.arange(len(nodes))
+        for _ in range(self.max_depth):
+            current = nodes[active]
+            go_left = X.take(offsets[active] + self.feature.take(current)) <= self.threshold.take(current)
+            nxt = np.where(go_left, self.children_left.take(current), self.children_right.take(current))
+            moved = nxt != current
+            nodes[active] = nxt
+            active = active[moved]
+            if len(active) == 0:
+                break
+        return nodes.reshape(n_rows, self.n_trees)
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        # Summed over the tree axis in tree order, as RandomForestClassifier does
+        proba = self.leaf_proba.take(leaves, axis=0).sum(axis=1)
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def load_compiled_forest(meta_path, mmap_mode='r', attempts=3):
+    directory = os.path.dirname(meta_path)
+    for _ in range(attempts):
+        with open(meta_path) as f:
+            text = f.read()
+        meta = json.loads(text)
+        if meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled model format in {directory}")
+        arrays = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode=mmap_mode) for name in ARRAYS}
+        # A re-export swapped in between the two reads would mix old and new arrays
+        with open(meta_path) as f:
+            if f.read() == text:
+                break
+    return CompiledForest(arrays, meta)
+
+
+def _sklearn_model(name):
+    import joblib
+    return joblib.load(model_source(name))
+
+
+def _check_inputs(name, n_random=20000, seed=0):
+    # Real rows from the bundled datasets plus random rows inside the widget bounds
+    import pandas as pd
+    from predictors import MATERNAL_FEATURES, MENSTRUAL_FEATURES, MENTAL_HEALTH_FEATURES
+    rng = np.random.default_rng(seed)
+    if name == 'maternal':
+        data = pd.read_csv(os.path.join(BASE_DIR, 'Maternal Health Risk Data Set.csv'))[MATERNAL_FEATURES]
+        bounds = [(10, 50), (50, 200), (30, 150), (2.0, 20.0), (80.0, 120.0), (50, 150)]
+        random = {c: rng.integers(lo, hi + 1, n_random) if isinstance(lo, int) else
+                  np.round(rng.uniform(lo, hi, n_random), 1)
+                  for c, (lo, hi) in zip(MATERNAL_FEATURES, bounds)}
+        return pd.concat([data, pd.DataFrame(random)], ignore_index=True).dropna()
+    if name == 'regularity':
+        data = pd.read_csv(os.path.join(BASE_DIR, 'Menstural_cyclelength.csv'))
+        start = pd.to_datetime(data['cycle_start_date'], format='%m/%d/%y')
+        data = pd.DataFrame({'age': data['age'], 'cycle_number': data['cycle_number'],
+                             'cycle_length': data['cycle_length'], 'cycle_start_day': start.dt.day,
+                             'cycle_start_month': start.dt.month, 'cycle_start_year': start.dt.year})
+        bounds = [(10, 50), (1, 20), (20, 40), (1, 31), (1, 12), (2000, 2100)]
+        random = {c: rng.integers(lo, hi + 1, n_random) for c, (lo, hi) in zip(MENSTRUAL_FEATURES, bounds)}
+        return pd.concat([data, pd.DataFrame(random)], ignore_index=True).dropna()
+    random = {'Age': rng.integers(10, 101, n_random)}
+    for c in MENTAL_HEALTH_FEATURES[1:]:
+        random[c] = rng.integers(0, 2, n_random)
+    return pd.DataFrame(random)
+
+
+def check(names=FOREST_MODELS):
+    ok = True
+    for name in names:
+        forest = _sklearn_model(name)
+        compiled = load_compiled_forest(os.path.join(compiled_path(name), 'meta.json'))
+        X = _check_inputs(name)
+        expected_proba = forest.predict_proba(X)
+        actual_proba = compiled.predict_proba(X)
+        same_labels = np.array_equal(forest.predict(X), compiled.predict(X))
+        max_diff = float(np.abs(expected_proba - actual_proba).max())
+        ok = ok and same_labels and max_diff == 0.0
+        print(f"{name}: {len(X)} rows, labels {'match' if same_labels else 'DIFFER'}, "
+              f"max probability difference {max_diff:.3g}")
+    return ok
+
+
+def _best_time(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(names=FOREST_MODELS, repeat=20):
+    results = {}
+    for name in names:
+        meta_path = os.path.join(compiled_path(name), 'meta.json')
+        load_pickle = _best_time(lambda: _sklearn_model(name), 3)
+        load_compiled = _best_time(lambda: load_compiled_forest(meta_path), 3)
+        forest, compiled = _sklearn_model(name), load_compiled_forest(meta_path)
+        X = _check_inputs(name, n_random=10000)
+        row = X.iloc[:1]
+        results[name] = {
+            'load_ms': {'pickle': load_pickle * 1e3, 'compiled': load_compiled * 1e3},
+            'single_row_ms': {'sklearn': _best_time(lambda: forest.predict(row), repeat) * 1e3,
+                              'compiled': _best_time(lambda: compiled.predict(row), repeat) * 1e3},
+            'batch_rows_per_second': {'sklearn': len(X) / _best_time(lambda: forest.predict(X), 3),
+                                      'compiled': len(X) / _best_time(lambda: compiled.predict(X), 3)},
+        }
+        r = results[name]
+        print(f"{name}: load {r['load_ms']['pickle']:.1f} ms -> {r['load_ms']['compiled']:.1f} ms, "
+              f"single row {r['single_row_ms']['sklearn']:.2f} ms -> {r['single_row_ms']['compiled']:.2f} ms, "
+              f"batch {r['batch_rows_per_second']['sklearn']:.0f} -> "
+              f"{r['batch_rows_per_second']['compiled']:.0f} rows/s")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the RandomForest models into NumPy arrays.")
+    parser.add_argument('command', choices=['export', 'check', 'bench'])
+    parser.add_argument('models', nargs='*', default=FOREST_MODELS, help="subset of: " + ', '.join(FOREST_MODELS))
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        for name in args.models:
+            print(f"Exported {name} to {export_forest(name, _sklearn_model(name))}")
+        sys.exit(0 if check(args.models) else 1)
+    elif args.command == 'check':
+        sys.exit(0 if check(args.models) else 1)
+    else:
+        bench(args.models)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,400 @@
+# Per-user hydration and BMI logs with rolling summaries and reminders.
+#
+# Every entry is appended to hydration_log or bmi_log in the local SQLite
+# store (WAL mode). The same transaction folds the value into health_summaries:
+# one row per user, metric and day, week or month, with count, total, min, max
+# and last value. Summaries are therefore read with a few primary-key lookups,
+# however long a user's history grows.
+#
+# Hydration reminders are kept in the reminders table with the time each one
+# is next due. ReminderScheduler is a background thread that fetches only
+# the reminders already due, through an index on next_due, and writes them to
+# reminder_events. It then sleeps until the next one is due. The Hydration
+# Tracker page just shows the events waiting for its user.
+#
+# Only the standard library is used, so the BMI and Hydration pages still
+# start without pandas.
+#
+#   python health_log.py scheduler      # run the reminder scheduler in its own process
+#   python health_log.py summary <user_id>
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from instrumentation import timed
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# The store ingestion.py writes to (not imported from there: it needs pandas)
+STORE_PATH = os.environ.get('WHD_DATA_STORE', os.path.join(BASE_DIR, '.cache', 'health_data.sqlite'))
+
+# Longest the scheduler sleeps, so reminders set by other processes are picked up
+SCHEDULER_POLL_SECONDS = 30
+# Reminders fired per query
+SCHEDULER_BATCH = 500
+
+DEFAULT_ACTIVE_HOURS = ('08:00', '22:00')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hydration_log (
+    entry_id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, logged_at TEXT NOT NULL, amount_ml INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bmi_log (
+    entry_id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, logged_at TEXT NOT NULL, height_m REAL NOT NULL,
+    weight_kg REAL NOT NULL, bmi REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS health_summaries (
+    user_id TEXT NOT NULL, metric TEXT NOT NULL, period TEXT NOT NULL, period_start TEXT NOT NULL,
+    count INTEGER NOT NULL, total REAL NOT NULL, min REAL, max REAL, last REAL, updated_at TEXT,
+    PRIMARY KEY (user_id, metric, period, period_start)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS reminders (
+    user_id TEXT PRIMARY KEY, interval_minutes INTEGER NOT NULL, active_from TEXT NOT NULL,
+    active_until TEXT NOT NULL, goal_ml INTEGER, next_due REAL NOT NULL, created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS reminders_next_due ON reminders (next_due);
+CREATE TABLE IF NOT EXISTS reminder_events (
+    event_id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, due_at REAL NOT NULL, message TEXT NOT NULL,
+    seen INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS reminder_events_unseen ON reminder_events (user_id, seen);
+"""
+
+_schema_ready = set()
+
+
+def connect(path=STORE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    if path not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(path)
+    return conn
+
+
+def period_starts(day):
+    # The day itself, the Monday of its week and the first of its month
+    return {
+        'day': day.isoformat(),
+        'week': (day - timedelta(days=day.weekday())).isoformat(),
+        'month': day.replace(day=1).isoformat(),
+    }
+
+
+def _fold(conn, user_id, metric, value, when):
+    conn.executemany(
+        'INSERT INTO health_summaries (user_id, metric, period, period_start, count, total, min, max, last, '
+        'updated_at) VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?) '
+        'ON CONFLICT (user_id, metric, period, period_start) DO UPDATE SET count = count + 1, '
+        'total = total + excluded.total, min = MIN(min, excluded.min), max = MAX(max, excluded.max), '
+        'last = excluded.last, updated_at = excluded.updated_at',
+        [(user_id, metric, period, start, value, value, value, value, when.isoformat(timespec='seconds'))
+         for period, start in period_starts(when.date()).items()])
+
+
+def log_water(user_id, amount_ml, when=None, path=STORE_PATH):
+    when = when or datetime.now()
+    with timed('whd_health_log_seconds', op='log_water'):
+        conn = connect(path)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT INTO hydration_log (user_id, logged_at, amount_ml) VALUES (?, ?, ?)',
+                         (str(user_id), when.isoformat(timespec='seconds'), int(amount_ml)))
+            _fold(conn, str(user_id), 'water_ml', int(amount_ml), when)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+
+def log_bmi(user_id, height_m, weight_kg, when=None, path=STORE_PATH):
+    when = when or datetime.now()
+    bmi = weight_kg / height_m ** 2
+    with timed('whd_health_log_seconds', op='log_bmi'):
+        conn = connect(path)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT INTO bmi_log (user_id, logged_at, height_m, weight_kg, bmi) VALUES (?, ?, ?, ?, ?)',
+                         (str(user_id), when.isoformat(timespec='seconds'), float(height_m), float(weight_kg), bmi))
+            _fold(conn, str(user_id), 'bmi', bmi, when)
+            _fold(conn, str(user_id), 'weight_kg', float(weight_kg), when)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+    return bmi
+
+
+def _summary(row):
+    if row is None:
+        return {'count': 0, 'total': 0.0, 'mean': None, 'min': None, 'max': None, 'last': None}
+    count, total, low, high, last = row
+    return {'count': count, 'total': total, 'mean': total / count, 'min': low, 'max': high, 'last': last}
+
+
+def summaries(user_id, metric, day=None, path=STORE_PATH):
+    """{'day'|'week'|'month': summary} for the periods containing day (default: today)."""
+    starts = period_starts(day or date.today())
+    with timed('whd_health_log_seconds', op='summaries'):
+        conn = connect(path)
+        try:
+            return {period: _summary(conn.execute(
+                'SELECT count, total, min, max, last FROM health_summaries '
+                'WHERE user_id = ? AND metric = ? AND period = ? AND period_start = ?',
+                (str(user_id), metric, period, start)).fetchone()) for period, start in starts.items()}
+        finally:
+            conn.close()
+
+
+def rolling(user_id, metric, days=7, day=None, path=STORE_PATH):
+    """Summary over the last `days` days up to day, from at most `days` daily rows."""
+    day = day or date.today()
+    conn = connect(path)
+    try:
+        rows = conn.execute(
+            'SELECT count, total, min, max, last FROM health_summaries '
+            'WHERE user_id = ? AND metric = ? AND period = ? AND period_start BETWEEN ? AND ? '
+            'ORDER BY period_start',
+            (str(user_id), metric, 'day', (day - timedelta(days=days - 1)).isoformat(), day.isoformat())).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        return dict(_summary(None), days=0, daily_mean=0.0)
+    count = sum(r[0] for r in rows)
+    total = sum(r[1] for r in rows)
+    return {'count': count, 'total': total, 'mean': total / count, 'min': min(r[2] for r in rows),
+            'max': max(r[3] for r in rows), 'last': rows[-1][4], 'days': len(rows),
+            'daily_mean': total / days}
+
+
+def history(user_id, metric, period='day', limit=30, path=STORE_PATH):
+    # Most recent periods first
+    conn = connect(path)
+    try:
+        rows = conn.execute(
+            'SELECT period_start, count, total, min, max, last FROM health_summaries '
+            'WHERE user_id = ? AND metric = ? AND period = ? ORDER BY period_start DESC LIMIT ?',
+            (str(user_id), metric, period, int(limit))).fetchall()
+    finally:
+        conn.close()
+    return [dict(_summary(row[1:]), period_start=row[0]) for row in rows]
+
+
+# Reminders
+
+def _at(day, hhmm):
+    hours, minutes = map(int, hhmm.split(':'))
+    return datetime.combine(day, datetime.min.time()).replace(hour=hours, minute=minutes)
+
+
+def next_due(after, interval_minutes, active_from, active_until):
+    """First reminder time after `after` inside the daily active hours."""
+    candidate = after + timedelta(minutes=interval_minutes)
+    start, end = _at(candidate.date(), active_from), _at(candidate.date(), active_until)
+    if candidate < start:
+        return start
+    if candidate > end:
+        return _at(candidate.date() + timedelta(days=1), active_from)
+    return candidate
+
+
+def set_reminder(user_id, interval_minutes, active_from=DEFAULT_ACTIVE_HOURS[0],
+                 active_until=DEFAULT_ACTIVE_HOURS[1], goal_ml=None, now=None, path=STORE_PATH):
+    if _at(date.min, active_from) >= _at(date.min, active_until):
+        raise ValueError(f"Reminder window {active_from}-{active_until} ends before it starts")
+    now = now or datetime.now()
+    due = next_due(now, interval_minutes, active_from, active_until)
+    conn = connect(path)
+    try:
+        conn.execute(
+            'INSERT OR REPLACE INTO reminders (user_id, interval_minutes, active_from, active_until, goal_ml, '
+            'next_due, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (str(user_id), int(interval_minutes), active_from, active_until,
+             None if goal_ml is None else int(goal_ml), due.timestamp(), now.isoformat(timespec='seconds')))
+    finally:
+        conn.close()
+    scheduler = current_scheduler()
+    if scheduler is not None:
+        scheduler.wake()
+    return due
+
+
+def clear_reminder(user_id, path=STORE_PATH):
+    conn = connect(path)
+    try:
+        conn.execute('DELETE FROM reminders WHERE user_id = ?', (str(user_id),))
+    finally:
+        conn.close()
+
+
+def get_reminder(user_id, path=STORE_PATH):
+    conn = connect(path)
+    try:
+        row = conn.execute('SELECT interval_minutes, active_from, active_until, goal_ml, next_due FROM reminders '
+                           'WHERE user_id = ?', (str(user_id),)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    interval, active_from, active_until, goal_ml, due = row
+    return {'interval_minutes': interval, 'active_from': active_from, 'active_until': active_until,
+            'goal_ml': goal_ml, 'next_due': datetime.fromtimestamp(due)}
+
+
+def pending_reminders(user_id, mark_seen=True, path=STORE_PATH):
+    conn = connect(path)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        rows = conn.execute('SELECT event_id, due_at, message FROM reminder_events WHERE user_id = ? AND seen = 0 '
+                            'ORDER BY due_at', (str(user_id),)).fetchall()
+        if mark_seen and rows:
+            conn.executemany('UPDATE reminder_events SET seen = 1 WHERE event_id = ?', [(r[0],) for r in rows])
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+    return [{'due_at': datetime.fromtimestamp(due), 'message': message} for _, due, message in rows]
+
+
+class ReminderScheduler:
+    def __init__(self, path=STORE_PATH, poll_seconds=SCHEDULER_POLL_SECONDS, batch=SCHEDULER_BATCH):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.batch = batch
+        self.fired = 0
+        self.skipped = 0
+        self.woken = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def run_once(self, now=None):
+        """Fire every reminder due at now; returns the seconds until the next one (or None)."""
+        now = now or datetime.now()
+        conn = connect(self.path)
+        try:
+            while True:
+                due = conn.execute(
+                    'SELECT user_id, interval_minutes, active_from, active_until, goal_ml, next_due FROM reminders '
+                    'WHERE next_due <= ? ORDER BY next_due LIMIT ?', (now.timestamp(), self.batch)).fetchall()
+                # One transaction per batch of due reminders
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    for user_id, interval, active_from, active_until, goal_ml, due_at in due:
+                        self._fire(conn, now, user_id, interval, active_from, active_until, goal_ml, due_at)
+                    conn.execute('COMMIT')
+                except BaseException:
+                    conn.execute('ROLLBACK')
+                    raise
+                if len(due) < self.batch:
+                    break
+            upcoming = conn.execute('SELECT MIN(next_due) FROM reminders').fetchone()[0]
+        finally:
+            conn.close()
+        return None if upcoming is None else max(0.0, upcoming - now.timestamp())
+
+    def _fire(self, conn, now, user_id, interval, active_from, active_until, goal_ml, due_at):
+        today = now.date()
+        drunk = 0
+        if goal_ml:
+            row = conn.execute(
+                'SELECT total FROM health_summaries WHERE user_id = ? AND metric = ? AND period = ? '
+                'AND period_start = ?', (user_id, 'water_ml', 'day', today.isoformat())).fetchone()
+            drunk = row[0] if row else 0
+        if goal_ml and drunk >= goal_ml:
+            # Goal reached: nothing more today
+            following = _at(today + timedelta(days=1), active_from)
+            message = None
+        else:
+            following = next_due(now, interval, active_from, active_until)
+            message = "Time to drink some water! 💧"
+            if goal_ml:
+                message += f" {goal_ml - drunk:.0f} ml to go today."
+        # Claimed by comparing next_due, so two schedulers never fire the same reminder twice
+        claimed = conn.execute('UPDATE reminders SET next_due = ? WHERE user_id = ? AND next_due = ?',
+                               (following.timestamp(), user_id, due_at)).rowcount
+        if claimed and message is not None:
+            conn.execute('INSERT INTO reminder_events (user_id, due_at, message) VALUES (?, ?, ?)',
+                         (user_id, due_at, message))
+        if claimed:
+            if message is None:
+                self.skipped += 1
+            else:
+                self.fired += 1
+
+    def _loop(self):
+        while not self.stopped.is_set():
+            try:
+                wait = self.run_once()
+            except sqlite3.Error:
+                wait = None
+            wait = self.poll_seconds if wait is None else min(wait, self.poll_seconds)
+            self.woken.wait(wait)
+            self.woken.clear()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._loop, name='reminder-scheduler', daemon=True)
+        self.thread.start()
+        return self
+
+    def wake(self):
+        self.woken.set()
+
+    def stop(self):
+        self.stopped.set()
+        self.woken.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    # One scheduler thread per process, started by the first page that needs it
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = ReminderScheduler().start()
+    return _scheduler
+
+
+def current_scheduler():
+    return _scheduler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hydration and BMI logs and the reminder scheduler.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('scheduler', help="fire hydration reminders until interrupted")
+    summary = commands.add_parser('summary', help="day, week and month summaries of one user")
+    summary.add_argument('user_id')
+    args = parser.parse_args(argv)
+
+    if args.command == 'scheduler':
+        scheduler = ReminderScheduler().start()
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            scheduler.stop()
+        print(f"Fired {scheduler.fired} reminders, skipped {scheduler.skipped} (goal reached)")
+    else:
+        print(json.dumps({metric: dict(summaries(args.user_id, metric), last_7_days=rolling(args.user_id, metric))
+                          for metric in ('water_ml', 'bmi', 'weight_kg')}, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+# Inference executor for the dashboard pages and the prediction service.
+#
+# Streamlit runs every session's script in a thread of one process, so a
+# forest scored inline holds the GIL and stalls everyone else's reruns. Pages
+# instead submit their feature rows here and get a Future back; the prediction
+# service awaits the same futures. A dispatcher thread per model coalesces
+# concurrent submissions into small batches and sends each batch to a pool of
+# worker processes that have the models loaded. If a worker dies, the pool is
+# replaced so later requests are served again.
+#
+# Environment:
+#   WHD_WORKERS                 worker processes (default: number of cores, 0 scores in the dispatcher thread)
+#   WHD_INFERENCE_QUEUE_DEPTH   requests waiting or in flight before submit() blocks (default: 256)
+#   WHD_MAX_BATCH_SIZE          largest batch sent to a worker (default: 64)
+#   WHD_MAX_WAIT_MS             how long a batch waits to fill up (default: 5)
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import predictors
+from instrumentation import observe
+from prediction_cache import normalize_row
+
+WORKERS = int(os.environ.get('WHD_WORKERS', os.cpu_count() or 1))
+QUEUE_DEPTH = int(os.environ.get('WHD_INFERENCE_QUEUE_DEPTH', 256))
+MAX_BATCH_SIZE = int(os.environ.get('WHD_MAX_BATCH_SIZE', 64))
+MAX_WAIT_MS = float(os.environ.get('WHD_MAX_WAIT_MS', 5))
+
+# How long submit() waits for room in the queue before giving up
+SUBMIT_TIMEOUT = 30
+
+
+class InferenceQueueFull(RuntimeError):
+    pass
+
+
+def _timed_batch(name, rows):
+    # Runs in the worker; the model time is sent back and recorded in the parent
+    start = time.perf_counter()
+    results, version = predictors.score_batch(name, rows)
+    return results, version, time.perf_counter() - start
+
+
+class InferenceExecutor:
+    def __init__(self, workers=WORKERS, queue_depth=QUEUE_DEPTH, max_batch_size=MAX_BATCH_SIZE,
+                 max_wait_ms=MAX_WAIT_MS):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.pool = self._new_pool() if workers > 0 else None
+        self.pool_restarts = 0
+        self.slots = threading.BoundedSemaphore(queue_depth)
+        self.queues = {name: queue.SimpleQueue() for name in predictors.BATCH_FUNCTIONS}
+        self.stats = {name: {'requests': 0, 'cache_hits': 0, 'batches': 0, 'errors': 0, 'rejected': 0}
+                      for name in predictors.BATCH_FUNCTIONS}
+        self.lock = threading.Lock()
+        self.threads = []
+        for name in predictors.BATCH_FUNCTIONS:
+            thread = threading.Thread(target=self._dispatch, args=(name,), name=f'inference-{name}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _new_pool(self):
+        # Spawned workers: forking a multi-threaded server (Streamlit, uvicorn) is not safe
+        pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=predictors.warm_up)
+        # Start the workers now rather than on the first prediction
+        pool.submit(predictors.warm_up)
+        return pool
+
+    def _replace_pool(self, broken):
+        # Called by whichever batch noticed first; the others find the pool already replaced
+        with self.lock:
+            if self.pool is not broken:
+                return
+            self.pool = self._new_pool()
+            self.pool_restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, name, row, timeout=SUBMIT_TIMEOUT):
+        """Return a Future for the prediction of one feature row.
+
+        Cached inputs get an already completed Future. Raises
+        InferenceQueueFull if the queue stays full for timeout seconds
+        (0 does not wait).
+        """
+        key = normalize_row(row)
+        found, result = predictors.PREDICTION_CACHES[name].lookup(key)
+        if found:
+            with self.lock:
+                self.stats[name]['cache_hits'] += 1
+            future = Future()
+            future.set_result(result)
+            return future
+        if not self.slots.acquire(timeout=timeout):
+            with self.lock:
+                self.stats[name]['rejected'] += 1
+            raise InferenceQueueFull(f"{self.queue_depth} {name} predictions already queued")
+        future = Future()
+        self.queues[name].put((row, key, future))
+        submitted = time.perf_counter()
+        future.add_done_callback(
+            lambda _: observe('whd_inference_request_seconds', time.perf_counter() - submitted, model=name))
+        return future
+
+    def _dispatch(self, name):
+        pending = self.queues[name]
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = pending.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    pending.put(None)
+                    break
+                batch.append(item)
+            rows = [row for row, _, _ in batch]
+            if self.pool is None:
+                done = Future()
+                try:
+                    done.set_result(_timed_batch(name, rows))
+                except Exception as e:
+                    done.set_exception(e)
+                self._resolve(name, batch, done)
+            else:
+                pool = self.pool
+                try:
+                    # The next batch fills up while this one is scored
+                    pool.submit(_timed_batch, name, rows).add_done_callback(
+                        lambda done, name=name, batch=batch, pool=pool: self._resolve(name, batch, done, pool))
+                except Exception as e:
+                    done = Future()
+                    done.set_exception(e)
+                    self._resolve(name, batch, done, pool)
+
+    def _resolve(self, name, batch, done, pool=None):
+        error = CancelledError() if done.cancelled() else done.exception()
+        if isinstance(error, BrokenProcessPool) and pool is not None:
+            # This batch is lost, but the next one goes to a fresh pool
+            self._replace_pool(pool)
+        with self.lock:
+            stats = self.stats[name]
+            stats['batches'] += 1
+            if error is None:
+                stats['requests'] += len(batch)
+            else:
+                stats['errors'] += len(batch)
+        cache = predictors.PREDICTION_CACHES[name]
+        if error is None:
+            results, version, seconds = done.result()
+            observe('whd_model_predict_seconds', seconds, model=name)
+        else:
+            results, version = [None] * len(batch), None
+        for (_, key, future), result in zip(batch, results):
+            if error is None:
+                cache.store(key, result, version)
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+            self.slots.release()
+
+    def metrics(self):
+        with self.lock:
+            models = {}
+            for name, stats in self.stats.items():
+                models[name] = dict(stats)
+                models[name]['mean_batch_size'] = (round(stats['requests'] / stats['batches'], 2)
+                                                   if stats['batches'] else 0.0)
+        return {'workers': self.workers, 'queue_depth': self.queue_depth, 'pool_restarts': self.pool_restarts,
+                'models': models}
+
+    def shutdown(self):
+        for pending in self.queues.values():
+            pending.put(None)
+        for thread in self.threads:
+            thread.join()
+        with self.lock:
+            pool = self.pool
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # One executor per process, shared by every Streamlit session
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = InferenceExecutor()
+                atexit.register(_executor.shutdown)
+    return _executor
+
+
+def current_executor():
+    # The shared executor if a page has started it, without starting one
+    return _executor
+
+
+def submit_risk(age, systolic_bp, diastolic_bp, bs, body_temp, heart_rate):
+    return get_executor().submit('maternal', [age, systolic_bp, diastolic_bp, bs, body_temp, heart_rate])
+
+
+def submit_cycle(age, cycle_length, start_date, cycle_number=1):
+    return get_executor().submit('menstrual',
+                                 predictors.menstrual_features(age, cycle_length, start_date, cycle_number))
+
+
+def submit_mental_health(age, family_history, work_interfere, benefits, seek_help, anonymity,
+                         mental_health_consequence):
+    row = predictors.encode_mental_health_inputs(age, family_history, work_interfere, benefits, seek_help,
+                                                 anonymity, mental_health_consequence)
+    return get_executor().submit('mental_health', row)
@@ -0,0 +1,398 @@
+# Incremental ingestion of the bundled CSV exports into a local SQLite store.
+#
+# Each CSV is read in chunks with explicit dtypes and only rows that are not in
+# the store yet are appended:
+#   maternal   append-only export without a key: rows past the last row read
+#   menstrual  keyed by (new_id, cycle_number); changed cycles are updated
+#   survey     rows with a Timestamp newer than the last one ingested
+#
+# The grouped counts behind the Home explorer (rows per combination of the
+# columns it filters and plots) are updated in the same transaction from the
+# new and changed rows only, so the Home page never rescans the raw data.
+#
+#   python ingestion.py            # ingest whatever is new
+#   python ingestion.py --rebuild  # drop the store and ingest from scratch
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from instrumentation import observe
+from model_registry import BASE_DIR, DATASET_FILES, cached_file_digest
+
+STORE_PATH = os.environ.get('WHD_DATA_STORE', os.path.join(BASE_DIR, '.cache', 'health_data.sqlite'))
+
+CHUNKSIZE = 50000
+
+# Explicit dtypes for each source; anything not listed is read as a string
+DTYPES = {
+    'maternal': {'Age': 'Int64', 'SystolicBP': 'Int64', 'DiastolicBP': 'Int64', 'BS': 'float64',
+                 'BodyTemp': 'float64', 'HeartRate': 'Int64', 'RiskLevel': 'string'},
+    'menstrual': {'new_id': 'Int64', 'age': 'Int64', 'cycle_number': 'Int64', 'cycle_start_date': 'string',
+                  'cycle_end_date': 'string', 'cycle_length': 'Int64', 'conception_cycle': 'string'},
+    'survey': {'Timestamp': 'string', 'Age': 'Int64'},
+}
+
+SURVEY_COLUMNS = [
+    'Timestamp', 'Age', 'Gender', 'Country', 'state', 'self_employed', 'family_history', 'treatment',
+    'work_interfere', 'no_employees', 'remote_work', 'tech_company', 'benefits', 'care_options',
+    'wellness_program', 'seek_help', 'anonymity', 'leave', 'mental_health_consequence',
+    'phys_health_consequence', 'coworkers', 'supervisor', 'mental_health_interview', 'phys_health_interview',
+    'mental_vs_physical', 'obs_consequence', 'comments',
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS maternal (
+    row_id INTEGER PRIMARY KEY, Age INTEGER, SystolicBP INTEGER, DiastolicBP INTEGER,
+    BS REAL, BodyTemp REAL, HeartRate INTEGER, RiskLevel TEXT
+);
+CREATE TABLE IF NOT EXISTS menstrual (
+    new_id INTEGER NOT NULL, age INTEGER, cycle_number INTEGER NOT NULL, cycle_start_date TEXT,
+    cycle_end_date TEXT, cycle_length INTEGER, conception_cycle TEXT,
+    PRIMARY KEY (new_id, cycle_number)
+);
+CREATE TABLE IF NOT EXISTS survey (
+    row_id INTEGER PRIMARY KEY, Timestamp TEXT NOT NULL, Age INTEGER, {survey_columns}
+);
+CREATE INDEX IF NOT EXISTS survey_timestamp ON survey (Timestamp);
+CREATE TABLE IF NOT EXISTS ingest_state (
+    source TEXT PRIMARY KEY, file_size INTEGER, file_mtime_ns INTEGER, sha256 TEXT,
+    rows_read INTEGER NOT NULL DEFAULT 0, watermark TEXT, rows_stored INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS group_counts (
+    source TEXT NOT NULL, key TEXT NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (source, key)
+);
+""".format(survey_columns=', '.join(f'"{c}" TEXT' for c in SURVEY_COLUMNS[2:]))
+
+# Columns whose value combinations are counted for the Home explorer
+GROUP_COLUMNS = {
+    'maternal': ['RiskLevel', 'Age', 'SystolicBP', 'DiastolicBP', 'BS', 'BodyTemp', 'HeartRate'],
+    'menstrual': ['age', 'cycle_number', 'cycle_length'],
+    'survey': ['Country', 'Age', 'Gender', 'treatment'],
+}
+
+# Bump when the ingested tables change shape; stores in an older format are re-ingested
+STORE_FORMAT = 2
+
+_lock = threading.Lock()
+
+
+def connect(path=STORE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    if conn.execute('PRAGMA user_version').fetchone()[0] != STORE_FORMAT:
+        _upgrade(conn)
+    return conn
+
+
+def _upgrade(conn):
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if conn.execute('PRAGMA user_version').fetchone()[0] != STORE_FORMAT:
+            conn.execute('DROP TABLE IF EXISTS home_counts')
+            for source in DATASET_FILES:
+                _reset_source(conn, source)
+            conn.execute(f'PRAGMA user_version = {STORE_FORMAT}')
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def reset_sources(path=STORE_PATH):
+    """Empty the ingested tables so the next ingest reads every CSV from scratch.
+
+    The store also holds user data (hydration and BMI logs,
+    reminders, logged cycles and their forecasts); those tables are left alone.
+    """
+    with _lock:
+        conn = connect(path)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for source in DATASET_FILES:
+                    _reset_source(conn, source)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+        _seen.pop(path, None)
+
+
+def _to_iso_date(values):
+    # The cycle export uses m/d/yy
+    return pd.to_datetime(values, format='%m/%d/%y', errors='coerce').dt.strftime('%Y-%m-%d')
+
+
+def _records(frame):
+    # sqlite3 wants plain Python values with None for missing
+    frame = frame.astype(object).where(frame.notna(), None)
+    return list(frame.itertuples(index=False, name=None))
+
+
+def _row_keys(frame):
+    # Comparable tuples for rows coming from a CSV chunk or from the store
+    def normalise(value):
+        if value is None or (isinstance(value, float) and value != value):
+            return ''
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+    return [tuple(normalise(v) for v in row) for row in _records(frame)]
+
+
+def _group_key(values):
+    # The same key whether the row came from a CSV chunk or from the store
+    def normalise(value):
+        if value is None or (isinstance(value, float) and value != value):
+            return None
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        return value
+    return json.dumps([normalise(v) for v in values])
+
+
+def _add_counts(conn, source, frame, sign=1):
+    # sign=-1 takes the values of replaced rows back out
+    frame = frame[GROUP_COLUMNS[source]]
+    if frame.empty:
+        return
+    counts = frame.groupby(list(frame.columns), dropna=False, sort=False).size()
+    keys = _records(counts.index.to_frame(index=False))
+    conn.executemany(
+        'INSERT INTO group_counts (source, key, count) VALUES (?, ?, ?) '
+        'ON CONFLICT (source, key) DO UPDATE SET count = count + excluded.count',
+        [(source, _group_key(key), sign * int(n)) for key, n in zip(keys, counts.to_numpy())])
+    if sign < 0:
+        conn.execute('DELETE FROM group_counts WHERE source = ? AND count <= 0', (source,))
+
+
+def _insert(conn, table, frame, key=None):
+    # With key, rows whose key is already stored are overwritten
+    columns = ', '.join(f'"{c}"' for c in frame.columns)
+    placeholders = ', '.join('?' for _ in frame.columns)
+    upsert = ''
+    if key:
+        updates = ', '.join(f'"{c}" = excluded."{c}"' for c in frame.columns if c not in key)
+        upsert = f' ON CONFLICT ({", ".join(key)}) DO UPDATE SET {updates}'
+    conn.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders}){upsert}', _records(frame))
+
+
+def _append_maternal(conn, chunk, state):
+    chunk = chunk[list(DTYPES['maternal'])]
+    _insert(conn, 'maternal', chunk)
+    _add_counts(conn, 'maternal', chunk)
+    return len(chunk)
+
+
+def _append_menstrual(conn, chunk, state):
+    chunk = chunk[list(DTYPES['menstrual'])].dropna(subset=['new_id', 'cycle_number'])
+    # The last copy of a cycle in the export wins, as it does across chunks
+    chunk = chunk.drop_duplicates(subset=['new_id', 'cycle_number'], keep='last')
+    chunk['cycle_start_date'] = _to_iso_date(chunk['cycle_start_date'])
+    chunk['cycle_end_date'] = _to_iso_date(chunk['cycle_end_date'])
+    # Stored copies of the incoming cycles: new cycles are inserted, changed ones
+    # (a cycle exported before its length was known, say) are overwritten
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS incoming_keys (new_id INTEGER, cycle_number INTEGER)')
+    conn.execute('DELETE FROM incoming_keys')
+    conn.executemany('INSERT INTO incoming_keys VALUES (?, ?)',
+                     _records(chunk[['new_id', 'cycle_number']]))
+    columns = ', '.join(f'm."{c}"' for c in chunk.columns)
+    stored = pd.read_sql_query(
+        f'SELECT {columns} FROM menstrual m '
+        'JOIN incoming_keys k ON m.new_id = k.new_id AND m.cycle_number = k.cycle_number', conn)
+    stored_rows = dict(zip(map(tuple, stored[['new_id', 'cycle_number']].to_numpy(dtype='int64').tolist()),
+                           _row_keys(stored)))
+    keys = map(tuple, chunk[['new_id', 'cycle_number']].to_numpy(dtype='int64').tolist())
+    status = [stored_rows.get(key, False) for key in keys]
+    is_new = pd.Series([s is False for s in status], index=chunk.index)
+    changed = pd.Series([s is not False and s != row for s, row in zip(status, _row_keys(chunk))],
+                        index=chunk.index)
+    if changed.any():
+        changed_keys = pd.MultiIndex.from_frame(chunk.loc[changed, ['new_id', 'cycle_number']].astype('int64'))
+        replaced = pd.MultiIndex.from_frame(stored[['new_id', 'cycle_number']].astype('int64')).isin(changed_keys)
+        _add_counts(conn, 'menstrual', stored[replaced], sign=-1)
+    written = chunk[is_new | changed]
+    _insert(conn, 'menstrual', written, key=['new_id', 'cycle_number'])
+    _add_counts(conn, 'menstrual', written)
+    state['updated'] += int(changed.sum())
+    return int(is_new.sum())
+
+
+def _append_survey(conn, chunk, state):
+    chunk = chunk[[c for c in SURVEY_COLUMNS if c in chunk.columns]]
+    # Filter against the watermark from before this pass, not one raised by an earlier chunk
+    watermark = state['since']
+    if watermark is not None:
+        newer = chunk['Timestamp'] > watermark
+        # Responses sharing the watermark second are compared with what is stored
+        same = chunk[chunk['Timestamp'] == watermark]
+        if len(same):
+            columns = ', '.join(f'"{c}"' for c in chunk.columns)
+            stored = pd.read_sql_query(f'SELECT {columns} FROM survey WHERE Timestamp = ?', conn,
+                                       params=(watermark,))
+            stored_rows = set(_row_keys(stored))
+            keep_same = [row not in stored_rows for row in _row_keys(same)]
+            newer[same.index[keep_same]] = True
+        chunk = chunk[newer]
+    if chunk.empty:
+        return 0
+    _insert(conn, 'survey', chunk)
+    state['watermark'] = max(str(chunk['Timestamp'].max()), state['watermark'] or '')
+    _add_counts(conn, 'survey', chunk)
+    return len(chunk)
+
+
+APPENDERS = {'maternal': _append_maternal, 'menstrual': _append_menstrual, 'survey': _append_survey}
+
+
+def _load_state(conn, source):
+    row = conn.execute('SELECT file_size, file_mtime_ns, sha256, rows_read, watermark, rows_stored '
+                       'FROM ingest_state WHERE source = ?', (source,)).fetchone()
+    if row is None:
+        return {'file_size': None, 'file_mtime_ns': None, 'sha256': None, 'rows_read': 0, 'watermark': None,
+                'rows_stored': 0}
+    return dict(zip(['file_size', 'file_mtime_ns', 'sha256', 'rows_read', 'watermark', 'rows_stored'], row))
+
+
+def _reset_source(conn, source):
+    conn.execute(f'DELETE FROM {source}')
+    conn.execute('DELETE FROM ingest_state WHERE source = ?', (source,))
+    conn.execute('DELETE FROM group_counts WHERE source = ?', (source,))
+
+
+def ingest_source(conn, source, path=None, chunksize=CHUNKSIZE):
+    path = path or os.path.join(BASE_DIR, DATASET_FILES[source])
+    st = os.stat(path)
+    state = _load_state(conn, source)
+    if (state['file_size'], state['file_mtime_ns']) == (st.st_size, st.st_mtime_ns):
+        return {'new': 0, 'updated': 0}
+    # A file that shrank was rewritten rather than appended to: start over
+    if state['file_size'] is not None and st.st_size < state['file_size']:
+        _reset_source(conn, source)
+        state = _load_state(conn, source)
+
+    appended = 0
+    rows_read = state['rows_read'] if source == 'maternal' else 0
+    state['since'] = state['watermark']
+    state['updated'] = 0
+    # Rows already read are skipped for the keyless maternal export. The cycle
+    # export is matched by key, so edited cycles are picked up; the survey is
+    # filtered by timestamp
+    skip = range(1, rows_read + 1) if source == 'maternal' else None
+    start = time.perf_counter()
+    reader = pd.read_csv(path, dtype=DTYPES[source], chunksize=chunksize, skiprows=skip, encoding='utf-8-sig')
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for chunk in reader:
+            chunk.columns = [str(c).strip() for c in chunk.columns]
+            appended += APPENDERS[source](conn, chunk, state)
+            rows_read += len(chunk)
+        conn.execute(
+            'INSERT OR REPLACE INTO ingest_state '
+            '(source, file_size, file_mtime_ns, sha256, rows_read, watermark, rows_stored, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (source, st.st_size, st.st_mtime_ns, cached_file_digest(path), rows_read, state['watermark'],
+             state['rows_stored'] + appended, datetime.now().isoformat(timespec='seconds')))
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    observe('whd_csv_read_seconds', time.perf_counter() - start, source=source)
+    return {'new': appended, 'updated': state['updated']}
+
+
+def ingest_all(path=STORE_PATH):
+    # Serialised within the process; SQLite's write lock covers other processes
+    with _lock:
+        conn = connect(path)
+        try:
+            return {source: ingest_source(conn, source) for source in DATASET_FILES}
+        finally:
+            conn.close()
+
+
+_seen = {}
+_seen_lock = threading.Lock()
+
+
+def refresh(path=STORE_PATH):
+    """Ingest new rows if any CSV changed since the last call and return the store version."""
+    stats = []
+    for filename in DATASET_FILES.values():
+        st = os.stat(os.path.join(BASE_DIR, filename))
+        stats.append((st.st_size, st.st_mtime_ns))
+    stats = tuple(stats)
+    seen = _seen.get(path)
+    if seen is not None and seen[0] == stats:
+        return seen[1]
+    with _seen_lock:
+        ingest_all(path)
+        conn = connect(path)
+        try:
+            version = store_version(conn)
+        finally:
+            conn.close()
+        _seen[path] = (stats, version)
+        return version
+
+
+def store_version(conn):
+    # Changes whenever any source gains rows
+    digest = hashlib.sha256()
+    for row in conn.execute('SELECT source, sha256, rows_stored FROM ingest_state ORDER BY source'):
+        digest.update(repr(row).encode())
+    return digest.hexdigest()[:32]
+
+
+def group_counts(conn, source):
+    """Rows of a source per combination of its GROUP_COLUMNS, as a frame with a count column n."""
+    columns = GROUP_COLUMNS[source]
+    rows = conn.execute('SELECT key, count FROM group_counts WHERE source = ?', (source,)).fetchall()
+    frame = pd.DataFrame([json.loads(key) for key, _ in rows], columns=columns)
+    for column in columns:
+        if DTYPES[source].get(column, 'string') != 'string':
+            frame[column] = pd.to_numeric(frame[column])
+    frame['n'] = [count for _, count in rows]
+    return frame
+
+
+def read_table(table, columns=None, where=None, params=(), path=STORE_PATH):
+    conn = connect(path)
+    try:
+        selected = ', '.join(f'"{c}"' for c in columns) if columns else '*'
+        query = f'SELECT {selected} FROM {table}' + (f' WHERE {where}' if where else '')
+        return pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest the CSV exports into the local SQLite store.")
+    parser.add_argument('--store', default=STORE_PATH)
+    parser.add_argument('--rebuild', action='store_true',
+                        help="empty the ingested tables and ingest from scratch (user logs are kept)")
+    args = parser.parse_args(argv)
+    if args.rebuild:
+        reset_sources(args.store)
+    start = time.perf_counter()
+    appended = ingest_all(args.store)
+    for source, n in appended.items():
+        print(f"{source}: {n['new']} new rows, {n['updated']} updated")
+    print(f"Done in {time.perf_counter() - start:.2f}s -> {args.store}")
+
+
+if __name__ == '__main__':
+    main()
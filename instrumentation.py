@@ -0,0 +1,152 @@
+# Process-wide timing histograms for the hot paths of the dashboard.
+#
+# Code under measurement wraps itself in timed(name, label=value, ...); every
+# observation lands in a cumulative histogram keyed by name and labels. The
+# registry can be rendered in the Prometheus text format, written to a file
+# (WHD_METRICS_FILE, refreshed after every rerun) or read by the Performance
+# page. Only the standard library is used, so importing this costs nothing.
+import contextlib
+import os
+import threading
+import time
+
+# Upper bounds in seconds, from 0.5 ms to 30 s
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRICS_FILE = os.environ.get('WHD_METRICS_FILE')
+
+# Help text for the Prometheus export
+DESCRIPTIONS = {
+    'whd_page_render_seconds': "Time to run a page's render() on a Streamlit rerun",
+    'whd_resource_load_seconds': "Time to load a model or dataset file into the registry",
+    'whd_csv_read_seconds': "Time to read and ingest one CSV export",
+    'whd_home_charts_seconds': "Time to fetch the Home chart specs",
+    'whd_home_chart_render_seconds': "Time to send one Home chart to the browser",
+    'whd_model_predict_seconds': "Time spent in a model prediction call (one batch)",
+    'whd_inference_request_seconds': "Time from submitting a prediction to its result",
+    'whd_encode_seconds': "Time to encode the mental-health answers into model features",
+    'whd_health_log_seconds': "Time to append a hydration or BMI entry, or to read its summaries",
+}
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # Linear interpolation inside the bucket, as Prometheus' histogram_quantile does
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for upper, n in zip(self.buckets + (self.max,), self.counts):
+            if n and seen + n >= rank:
+                upper = min(upper, self.max)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = upper
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.sum / self.count * 1e3, 3) if self.count else 0.0,
+            'p50_ms': round(self.quantile(0.5) * 1e3, 3),
+            'p95_ms': round(self.quantile(0.95) * 1e3, 3),
+            'max_ms': round(self.max * 1e3, 3),
+            'total_s': round(self.sum, 4),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def summaries(self, name):
+        # {label values: summary} for one metric
+        with self.lock:
+            return {labels: h.summary() for (n, labels), h in sorted(self.histograms.items()) if n == name}
+
+    def prometheus_text(self):
+        lines = []
+        with self.lock:
+            items = sorted(self.histograms.items())
+            described = set()
+            for (name, labels), h in items:
+                if name not in described:
+                    lines.append(f"# HELP {name} {DESCRIPTIONS.get(name, name)}")
+                    lines.append(f"# TYPE {name} histogram")
+                    described.add(name)
+                base = [f'{k}="{_escape(v)}"' for k, v in labels]
+                cumulative = 0
+                for bound, n in zip(h.buckets + (float('inf'),), h.counts):
+                    cumulative += n
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    bucket_labels = ','.join(base + ['le="%s"' % le])
+                    lines.append(f"{name}_bucket{{{bucket_labels}}} {cumulative}")
+                suffix = f"{{{','.join(base)}}}" if base else ''
+                lines.append(f"{name}_sum{suffix} {h.sum!r}")
+                lines.append(f"{name}_count{suffix} {h.count}")
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        # Written to a temporary file first so a scraper never reads half a file
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# The shared registry, created once when this module is first imported
+metrics = MetricsRegistry()
+
+
+def observe(name, seconds, **labels):
+    metrics.observe(name, seconds, **labels)
+
+
+@contextlib.contextmanager
+def timed(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe(name, time.perf_counter() - start, **labels)
+
+
+def dump_if_configured():
+    if METRICS_FILE:
+        metrics.dump(METRICS_FILE)
@@ -0,0 +1,391 @@
+# Multi-session load generator for the dashboard.
+#
+# Starts app_new.py under `streamlit run` on a free local port (or attaches to
+# --url). It then opens N concurrent sessions on the same websocket a browser
+# uses, exchanging Streamlit's own protobuf messages. Each session visits the
+# sidebar pages in turn. On every page it gives each widget a random value
+# inside the widget's own bounds, then clicks the page's buttons one by one.
+# The time from sending a rerun to its script_finished message is one sample.
+#
+# Reported: per-page latency percentiles for opening the page, changing the
+# inputs and clicking buttons, the error rate, and the server's memory (RSS of
+# the process and its workers) before and after the sessions connect. Nothing
+# leaves the machine.
+#
+#   python load_test.py --sessions 20 --iterations 3        # -> bench_results/loadtest-<commit>.json
+#   python load_test.py --url http://127.0.0.1:8501 --sessions 50
+#   python load_test.py --compare old.json new.json          # same as benchmark.py --compare
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from websockets.asyncio.client import connect
+from websockets.exceptions import WebSocketException
+
+from benchmark import APP_PATH, BASE_DIR, RESULTS_DIR, _git_commit, _percentile, compare
+
+# The sidebar pages every session walks through
+PAGES = ["Home", "Maternal Health", "Menstrual Cycle", "Mental Well-being", "BMI Calculator", "Hydration Tracker"]
+
+# Label of the sidebar radio in app_new.py
+NAVIGATION_LABEL = "Go to"
+
+INPUT_WIDGETS = {'number_input', 'selectbox', 'radio', 'multiselect', 'text_input', 'time_input'}
+
+# Seconds to wait for one rerun before counting it as an error
+RERUN_TIMEOUT = 120
+SERVER_START_TIMEOUT = 60
+
+
+class Session:
+    def __init__(self, number, url, rng, timeout=RERUN_TIMEOUT):
+        self.number = number
+        self.url = url
+        self.rng = rng
+        self.timeout = timeout
+        self.ws = None
+        self.widgets = {}
+        self.states = {}
+        self.samples = []
+        self.errors = []
+
+    async def open(self):
+        self.ws = await connect(self.url, subprotocols=['streamlit'], max_size=None, open_timeout=self.timeout)
+        return await self.rerun(PAGES[0], 'open')
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def rerun(self, page, action, triggers=()):
+        """Send the current widget states (plus one-off button triggers) and wait for the run to finish."""
+        message = BackMsg()
+        message.rerun_script.query_string = ''
+        message.rerun_script.page_script_hash = ''
+        for state in list(self.states.values()) + list(triggers):
+            message.rerun_script.widget_states.widgets.add().CopyFrom(state)
+        start = time.perf_counter()
+        received = 0
+        widgets, exceptions = {}, []
+        try:
+            await self.ws.send(message.SerializeToString())
+            while True:
+                data = await asyncio.wait_for(self.ws.recv(), self.timeout)
+                received += len(data)
+                msg = ForwardMsg()
+                msg.ParseFromString(data)
+                kind = msg.WhichOneof('type')
+                if kind == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+                    element = msg.delta.new_element
+                    element_type = element.WhichOneof('type')
+                    if element_type == 'exception':
+                        exceptions.append(f"{element.exception.type}: {element.exception.message}"[:200])
+                    elif element_type in INPUT_WIDGETS or element_type == 'button':
+                        widget = getattr(element, element_type)
+                        widgets[widget.id] = (element_type, widget)
+                elif kind == 'script_finished':
+                    if msg.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                        # st.rerun() or a newer rerun request: the elements of the next run replace these
+                        widgets, exceptions = {}, []
+                        continue
+                    if msg.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                        exceptions.append("script compile error")
+                    break
+        except (asyncio.TimeoutError, WebSocketException, OSError) as e:
+            exceptions.append(f"{type(e).__name__}: {e}"[:200])
+        seconds = time.perf_counter() - start
+        self.widgets = widgets
+        self.samples.append({'page': page, 'action': action, 'seconds': seconds, 'bytes': received,
+                             'ok': not exceptions})
+        self.errors.extend({'page': page, 'action': action, 'error': error} for error in exceptions)
+        return not exceptions
+
+    def _random_state(self, element_type, widget):
+        # A value the browser could send for this widget, inside its bounds
+        state = BackMsg().rerun_script.widget_states.widgets.add()
+        state.id = widget.id
+        rng = self.rng
+        if element_type == 'number_input':
+            low = widget.min if widget.has_min else widget.default - 100
+            high = widget.max if widget.has_max else widget.default + 100
+            if widget.data_type == widget.INT:
+                state.double_value = rng.randint(int(low), int(high))
+            else:
+                step = widget.step or 0.01
+                state.double_value = round(low + step * rng.randint(0, int(round((high - low) / step))), 6)
+        elif element_type in ('selectbox', 'radio'):
+            state.string_value = rng.choice(list(widget.options))
+        elif element_type == 'multiselect':
+            options = list(widget.options)
+            state.string_array_value.data.extend(rng.sample(options, rng.randint(0, min(3, len(options)))))
+        elif element_type == 'text_input':
+            # The only free-text inputs are User IDs: one per session, so the log pages are exercised
+            state.string_value = f'load-test-{self.number}'
+        elif element_type == 'time_input':
+            state.string_value = f'{rng.randint(0, 23):02d}:{rng.choice([0, 15, 30, 45]):02d}'
+        return state
+
+    def _navigation(self):
+        for element_type, widget in self.widgets.values():
+            if element_type == 'radio' and widget.label == NAVIGATION_LABEL:
+                return widget
+        return None
+
+    async def visit(self, page):
+        navigation = self._navigation()
+        if navigation is None:
+            self.errors.append({'page': page, 'action': 'open', 'error': "sidebar navigation not found"})
+            return
+        state = self._random_state('radio', navigation)
+        state.string_value = page
+        # Inputs of the previous page are dropped, as the browser drops widgets that are gone
+        self.states = {navigation.id: state}
+        if not await self.rerun(page, 'open'):
+            return
+        for widget_id, (element_type, widget) in self.widgets.items():
+            if element_type in INPUT_WIDGETS and widget_id != navigation.id:
+                self.states[widget_id] = self._random_state(element_type, widget)
+        if not await self.rerun(page, 'input'):
+            return
+        clicked = set()
+        while True:
+            buttons = [(widget_id, widget) for widget_id, (element_type, widget) in self.widgets.items()
+                       if element_type == 'button' and widget_id not in clicked]
+            if not buttons:
+                break
+            widget_id, widget = buttons[0]
+            clicked.add(widget_id)
+            trigger = BackMsg().rerun_script.widget_states.widgets.add()
+            trigger.id = widget_id
+            trigger.trigger_value = True
+            await self.rerun(page, 'click', [trigger])
+
+
+async def run_session(number, url, rng, iterations, all_open, done):
+    session = Session(number, url, rng)
+    try:
+        if await session.open():
+            for _ in range(iterations):
+                for page in PAGES:
+                    await session.visit(page)
+    except (WebSocketException, OSError) as e:
+        session.errors.append({'page': None, 'action': 'connect', 'error': f"{type(e).__name__}: {e}"[:200]})
+    finally:
+        done.append(session)
+        # Connected sessions stay open until all have finished, so the memory sample sees all of them
+        await all_open.wait()
+        await session.close()
+    return session
+
+
+def process_rss(pid):
+    """Resident memory in bytes of pid and all its descendants (Linux /proc), or None."""
+    try:
+        children = {}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open(f'/proc/{entry}/stat') as f:
+                        ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+                except (OSError, IndexError, ValueError):
+                    continue
+                children.setdefault(ppid, []).append(int(entry))
+        total, pending = 0, [pid]
+        while pending:
+            current = pending.pop()
+            pending.extend(children.get(current, []))
+            try:
+                with open(f'/proc/{current}/status') as f:
+                    for line in f:
+                        if line.startswith('VmRSS:'):
+                            total += int(line.split()[1]) * 1024
+            except OSError:
+                pass
+        return total
+    except OSError:
+        return None
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, store_dir):
+    # A headless server on localhost; the data store goes to store_dir so runs start alike
+    env = dict(os.environ, WHD_DATA_STORE=os.path.join(store_dir, 'health_data.sqlite'), PYTHONWARNINGS='ignore')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', APP_PATH, '--server.headless', 'true',
+         '--server.address', '127.0.0.1', '--server.port', str(port), '--server.enableXsrfProtection', 'false',
+         '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false'],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"streamlit exited: {server.stderr.read().strip()[-500:]}")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"streamlit did not answer on port {port} within {SERVER_START_TIMEOUT}s")
+
+
+def _latency(samples):
+    seconds = [s['seconds'] for s in samples]
+    return {
+        'n': len(seconds),
+        'errors': sum(not s['ok'] for s in samples),
+        'p50_ms': round(_percentile(seconds, 0.5) * 1e3, 3),
+        'p95_ms': round(_percentile(seconds, 0.95) * 1e3, 3),
+        'p99_ms': round(_percentile(seconds, 0.99) * 1e3, 3),
+        'max_ms': round(max(seconds) * 1e3, 3),
+        'mean_kb': round(sum(s['bytes'] for s in samples) / len(samples) / 1024, 1),
+    }
+
+
+async def load_test(url, sessions, iterations, ramp_up, seed, server_pid=None):
+    ws_url = url.replace('http', 'ws', 1).rstrip('/') + '/_stcore/stream'
+    rss_before = process_rss(server_pid) if server_pid else None
+    all_open, done = asyncio.Event(), []
+    rss_peak = rss_before or 0
+
+    async def sample_memory():
+        nonlocal rss_peak
+        while True:
+            rss_peak = max(rss_peak, process_rss(server_pid) or 0)
+            await asyncio.sleep(1)
+
+    sampler = asyncio.ensure_future(sample_memory()) if server_pid else None
+    start = time.perf_counter()
+    tasks = []
+    for number in range(sessions):
+        tasks.append(asyncio.ensure_future(
+            run_session(number, ws_url, random.Random(seed * 100003 + number), iterations, all_open, done)))
+        if ramp_up and number < sessions - 1:
+            await asyncio.sleep(ramp_up / sessions)
+    while len(done) < sessions:
+        await asyncio.sleep(0.1)
+    rss_connected = process_rss(server_pid) if server_pid else None
+    all_open.set()
+    finished = await asyncio.gather(*tasks)
+    seconds = time.perf_counter() - start
+    if sampler is not None:
+        sampler.cancel()
+
+    samples = [s for session in finished for s in session.samples]
+    errors = [e for session in finished for e in session.errors]
+    pages = {}
+    for page in PAGES:
+        page_samples = [s for s in samples if s['page'] == page]
+        if page_samples:
+            pages[page] = dict(_latency(page_samples), actions={
+                action: _latency([s for s in page_samples if s['action'] == action])
+                for action in ('open', 'input', 'click') if any(s['action'] == action for s in page_samples)})
+    error_counts = {}
+    for error in errors:
+        key = f"{error['page']} / {error['action']}: {error['error']}"
+        error_counts[key] = error_counts.get(key, 0) + 1
+    memory = {}
+    if rss_before is not None:
+        memory = {
+            'rss_before_mb': round(rss_before / 2 ** 20, 1),
+            'rss_connected_mb': round(rss_connected / 2 ** 20, 1),
+            'rss_peak_mb': round(max(rss_peak, rss_connected) / 2 ** 20, 1),
+            'rss_after_mb': round(process_rss(server_pid) / 2 ** 20, 1),
+            'growth_per_session_mb': round((rss_connected - rss_before) / 2 ** 20 / sessions, 2),
+        }
+    return {
+        'sessions': sessions,
+        'iterations': iterations,
+        'seconds': round(seconds, 2),
+        'reruns': len(samples),
+        'reruns_per_second': round(len(samples) / seconds, 2),
+        'error_rate': round(sum(not s['ok'] for s in samples) / len(samples), 4) if samples else 0.0,
+        'all': _latency(samples) if samples else {},
+        'pages': pages,
+        'memory': memory,
+        'errors': dict(sorted(error_counts.items(), key=lambda item: -item[1])),
+    }
+
+
+def report(results):
+    lines = [f"{results['sessions']} sessions x {results['iterations']} passes: {results['reruns']} reruns in "
+             f"{results['seconds']}s ({results['reruns_per_second']}/s), error rate {results['error_rate']:.2%}",
+             f"{'page':20s} {'action':7s} {'n':>6s} {'errors':>6s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} "
+             f"{'max ms':>9s} {'KB':>7s}"]
+    for page, stats in results['pages'].items():
+        for action, s in stats['actions'].items():
+            lines.append(f"{page:20s} {action:7s} {s['n']:6d} {s['errors']:6d} {s['p50_ms']:9.1f} {s['p95_ms']:9.1f} "
+                         f"{s['p99_ms']:9.1f} {s['max_ms']:9.1f} {s['mean_kb']:7.1f}")
+    memory = results['memory']
+    if memory:
+        lines.append(f"server RSS: {memory['rss_before_mb']} MB before, {memory['rss_connected_mb']} MB with all "
+                     f"sessions connected ({memory['growth_per_session_mb']:+} MB per session), peak "
+                     f"{memory['rss_peak_mb']} MB, {memory['rss_after_mb']} MB after")
+    for error, count in list(results['errors'].items())[:10]:
+        lines.append(f"{count:6d} x {error}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent users of the dashboard.")
+    parser.add_argument('--sessions', type=int, default=10)
+    parser.add_argument('--iterations', type=int, default=2, help="passes over the pages per session")
+    parser.add_argument('--ramp-up', type=float, default=5.0, help="seconds over which sessions connect")
+    parser.add_argument('--warmup', type=int, default=1, help="sessions run first and not recorded")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--url', help="an already running app (default: start one on a free port)")
+    parser.add_argument('-o', '--output', help="JSON file to write (default: bench_results/loadtest-<commit>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="compare two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    server = None
+    with tempfile.TemporaryDirectory(prefix='whd-load-') as store_dir:
+        try:
+            if args.url:
+                url, server_pid = args.url, None
+            else:
+                port = _free_port()
+                print(f"Starting streamlit on port {port}...", file=sys.stderr)
+                server = start_server(port, store_dir)
+                url, server_pid = f'http://127.0.0.1:{port}', server.pid
+            if args.warmup:
+                # Loads the models and builds the Home caches before anything is measured
+                asyncio.run(load_test(url, args.warmup, 1, 0, args.seed + 1))
+            results = asyncio.run(load_test(url, args.sessions, args.iterations, args.ramp_up, args.seed, server_pid))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+
+    results.update(commit=_git_commit(), timestamp=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                   url=args.url or 'local', seed=args.seed)
+    print(report(results))
+    output = args.output or os.path.join(RESULTS_DIR, f"loadtest-{results['commit'] or 'results'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
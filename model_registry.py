@@ -0,0 +1,283 @@
+# Process-wide registry for the models and datasets used by the dashboard.
+#
+# Streamlit reruns app_new.py from the top on every widget change, but imported
+# modules are only executed once per process. Keeping the loaded objects here
+# means every rerun and every session shares a single copy, and a file is only
+# read again when it changes on disk.
+import hashlib
+import os
+import sys
+import threading
+import time
+
+import joblib
+import pandas as pd
+
+from instrumentation import observe
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Model files, keyed by the short name the app uses
+MODEL_FILES = {
+    'maternal': 'maternal_health_model.pkl',
+    'regularity': 'model_regularity (1).pkl',
+    'ovulation': 'model_ovulation (1).pkl',
+    'mental': 'women_mental_health_model.pkl',
+}
+
+# Compiled forests written by forest_compiler.py. They are used in place of the
+# pickles when present and built from the current pickle, unless
+# WHD_COMPILED_MODELS=0 is set.
+COMPILED_DIR = os.path.join(BASE_DIR, 'compiled_models')
+USE_COMPILED = os.environ.get('WHD_COMPILED_MODELS', '1') != '0'
+
+# Dataset files, keyed by the short name the app uses
+DATASET_FILES = {
+    'maternal': 'Maternal Health Risk Data Set.csv',
+    'menstrual': 'Menstural_cyclelength.csv',
+    'survey': 'survey.csv',
+}
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+_digest_cache = {}
+
+
+def cached_file_digest(path):
+    # Hash a file once per (mtime, size) without loading it
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    digest = _digest_cache.get(key)
+    if digest is None:
+        digest = file_digest(path)
+        _digest_cache[key] = digest
+    return digest
+
+
+def estimate_nbytes(obj):
+    # DataFrames know their own size
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    # Forests: sum the node arrays of every tree
+    if hasattr(obj, 'estimators_'):
+        total = sys.getsizeof(obj)
+        for estimator in obj.estimators_:
+            tree = getattr(estimator, 'tree_', None)
+            if tree is None:
+                continue
+            for name in ('children_left', 'children_right', 'feature', 'threshold', 'value',
+                         'impurity', 'n_node_samples', 'weighted_n_node_samples'):
+                total += getattr(tree, name).nbytes
+        return int(total)
+    # Linear models and anything else with numpy attributes
+    total = sys.getsizeof(obj)
+    for value in getattr(obj, '__dict__', {}).values():
+        total += getattr(value, 'nbytes', sys.getsizeof(value))
+    return int(total)
+
+
+def check_features(name, model):
+    # The encoders in predictors.py must produce exactly the columns the model was fitted on.
+    # Checked once per load, so a mismatched model never serves a prediction.
+    from predictors import MODEL_FEATURES
+    expected = MODEL_FEATURES.get(name)
+    fitted = [str(f) for f in getattr(model, 'feature_names_in_', [])]
+    if expected is not None and fitted != expected:
+        raise ValueError(f"The {name} model was fitted on {fitted or 'unnamed features'}, "
+                         f"predictors.py encodes {expected}")
+    return model
+
+
+def model_loader(name):
+    return lambda path: check_features(name, joblib.load(path))
+
+
+class Resource:
+    def __init__(self, name, path, loader):
+        self.name = name
+        self.path = path
+        self.loader = loader
+        self.value = None
+        self.mtime = None
+        self.size = None
+        self.digest = None
+        self.nbytes = 0
+        self.load_seconds = 0.0
+        self.loaded_at = None
+        self.loads = 0
+        self.lock = threading.Lock()
+
+    def stat(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def load(self):
+        mtime, size = self.stat()
+        digest = file_digest(self.path)
+        # mtime changed but the contents did not (e.g. a touch or a re-copy)
+        if self.value is not None and digest == self.digest:
+            self.mtime, self.size = mtime, size
+            return
+        start = time.perf_counter()
+        value = self.loader(self.path)
+        self.load_seconds = time.perf_counter() - start
+        observe('whd_resource_load_seconds', self.load_seconds, resource=self.name)
+        self.value = value
+        self.mtime, self.size, self.digest = mtime, size, digest
+        self.nbytes = estimate_nbytes(value)
+        self.loaded_at = time.time()
+        self.loads += 1
+
+    def get(self):
+        # Cheap path: one stat() call, no locking once loaded
+        if self.value is not None and self.stat() == (self.mtime, self.size):
+            return self.value
+        with self.lock:
+            if self.value is None or self.stat() != (self.mtime, self.size):
+                self.load()
+            return self.value
+
+    def info(self):
+        return {
+            'name': self.name,
+            'path': os.path.basename(self.path),
+            'loaded': self.value is not None,
+            'sha256': self.digest,
+            'file_bytes': self.size,
+            'memory_bytes': self.nbytes,
+            'load_seconds': round(self.load_seconds, 4),
+            'loads': self.loads,
+            'loaded_at': self.loaded_at,
+        }
+
+
+class ResourceRegistry:
+    def __init__(self, base_dir=BASE_DIR):
+        self.base_dir = base_dir
+        self.resources = {}
+        self.lock = threading.Lock()
+
+    def register(self, key, filename, loader):
+        path = os.path.join(self.base_dir, filename)
+        with self.lock:
+            existing = self.resources.get(key)
+            if existing is None or existing.path != path:
+                self.resources[key] = Resource(key, path, loader)
+            return self.resources[key]
+
+    def get(self, key):
+        return self.resources[key].get()
+
+    def digest(self, key):
+        resource = self.resources[key]
+        resource.get()
+        return resource.digest
+
+    def footprint(self):
+        return [resource.info() for resource in self.resources.values()]
+
+    def total_nbytes(self):
+        return sum(resource.nbytes for resource in self.resources.values())
+
+
+# The shared registry, created once when this module is first imported
+registry = ResourceRegistry()
+for _name, _filename in MODEL_FILES.items():
+    registry.register('model:' + _name, _filename, model_loader(_name))
+for _name, _filename in DATASET_FILES.items():
+    registry.register('data:' + _name, _filename, pd.read_csv)
+
+
+def _model_store():
+    # Versioned artifacts (model_store.py) take over from MODEL_FILES once a manifest lists a model
+    from model_store import store
+    return store
+
+
+def model_sha256(name):
+    """Checksum of the artifact get_model(name) serves in this process.
+
+    With a model store this is the version already swapped in, or the
+    active version if this process has not loaded one yet.
+    """
+    store = _model_store()
+    if not store.has(name):
+        return cached_file_digest(os.path.join(registry.base_dir, MODEL_FILES[name]))
+    return store.serving_sha256(name)
+
+
+def model_source(name):
+    # Path of the pickle that serves name: the active store version or the bundled file
+    store = _model_store()
+    if store.has(name):
+        return os.path.join(store.root, store.entry(name)['file'])
+    return os.path.join(registry.base_dir, MODEL_FILES[name])
+
+
+def get_compiled_model(name, sha256=None):
+    # sha256: the pickle the forest must have been compiled from (default: the one served)
+    meta_path = os.path.join(COMPILED_DIR, name, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    key = 'compiled:' + name
+    if key not in registry.resources:
+        from forest_compiler import load_compiled_forest
+        registry.register(key, os.path.relpath(meta_path, registry.base_dir),
+                          lambda path: check_features(name, load_compiled_forest(path)))
+    try:
+        forest = registry.get(key)
+    except FileNotFoundError:
+        # forest_compiler.py is swapping in a new export: serve the pickle meanwhile
+        return None
+    # A compiled forest built from an older pickle or another store version is ignored
+    if sha256 is None:
+        store = _model_store()
+        if store.has(name):
+            sha256 = store.entry(name)['sha256']
+        else:
+            sha256 = cached_file_digest(os.path.join(registry.base_dir, MODEL_FILES[name]))
+    if forest.meta['source_sha256'] != sha256:
+        return None
+    return forest
+
+
+def get_model(name, compiled=True):
+    # Bulk jobs pass compiled=False: sklearn is faster on very large batches,
+    # the compiled forest is faster to load and for small batches
+    store = _model_store()
+    if store.has(name):
+        # The store picks the compiled forest of a version itself, so it is swapped like the pickle
+        return store.get(name) if compiled else store.load_active(name)
+    if compiled and USE_COMPILED:
+        forest = get_compiled_model(name)
+        if forest is not None:
+            return forest
+    return registry.get('model:' + name)
+
+
+def observe_prediction(name, X, predictions, seconds):
+    # Live batches are offered to the shadow version of the model, if one is set
+    _model_store().observe(name, X, predictions, seconds)
+
+
+def get_dataset(name):
+    return registry.get('data:' + name)
+
+
+def dataset_digest(name):
+    return registry.digest('data:' + name)
+
+
+def model_digest(name):
+    return model_sha256(name)
+
+
+def memory_report():
+    return registry.footprint()
@@ -0,0 +1,491 @@
+# Versioned model artifacts with warm swap and shadow evaluation.
+#
+# model_store/manifest.json lists every registered version of each model with
+# its checksum, the hash of the dataset it was trained on and its feature
+# schema, plus the active version and an optional shadow version. Every
+# process watches the manifest. A newly activated version is loaded and warmed
+# in a background thread and swapped in with a single assignment, so requests
+# keep being answered by the old version until the new one is ready.
+#
+# A shadow version sees the same inputs as the active one: predictors.py hands
+# each live batch to a background thread, which scores it with the candidate
+# and records agreement and latency. Nothing is added to the request path
+# beyond a non-blocking queue put. Results are kept in the SQLite store.
+#
+# Command line:
+#   python model_store.py init                           # import the bundled .pkl files as v1
+#   python model_store.py register maternal new.pkl      # -> v2, with --dataset for a custom training set
+#   python model_store.py activate maternal v2
+#   python model_store.py shadow maternal v2             # or: shadow maternal --off
+#   python model_store.py list
+#   python model_store.py report                         # shadow results
+import argparse
+import atexit
+import json
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+import ingestion
+from model_registry import (BASE_DIR, DATASET_FILES, MODEL_FILES, USE_COMPILED, file_digest, get_compiled_model,
+                            model_loader, registry)
+
+STORE_DIR = os.environ.get('WHD_MODEL_STORE', os.path.join(BASE_DIR, 'model_store'))
+MANIFEST_NAME = 'manifest.json'
+
+# Dataset each bundled model was trained on
+TRAINING_DATASETS = {'maternal': 'maternal', 'regularity': 'menstrual', 'ovulation': 'menstrual', 'mental': 'survey'}
+
+# Fraction of live batches also scored by the shadow version
+SHADOW_SAMPLE = float(os.environ.get('WHD_SHADOW_SAMPLE', 1.0))
+SHADOW_QUEUE_SIZE = 100
+SHADOW_FLUSH_SECONDS = 2.0
+# Load and shadow events kept for the performance page
+EVENT_HISTORY = 100
+
+SHADOW_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shadow_results (
+    model TEXT NOT NULL, active_version TEXT NOT NULL, shadow_version TEXT NOT NULL, process TEXT NOT NULL,
+    batches INTEGER, predictions INTEGER, agreements INTEGER, abs_diff_sum REAL, active_seconds REAL,
+    shadow_seconds REAL, dropped INTEGER, updated_at TEXT,
+    PRIMARY KEY (model, active_version, shadow_version, process)
+);
+"""
+
+Slot = namedtuple('Slot', ['version', 'model', 'sha256'])
+
+
+def model_schema(model):
+    return {
+        'estimator': type(model).__name__,
+        'features': [str(f) for f in getattr(model, 'feature_names_in_', [])],
+        'n_features': int(getattr(model, 'n_features_in_', 0)),
+        'classes': np.asarray(model.classes_).tolist() if hasattr(model, 'classes_') else None,
+    }
+
+
+class ModelStore:
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self.manifest = {'models': {}}
+        self.manifest_stat = None
+        self.serving = {}
+        self.shadows = {}
+        self.bulk = {}
+        self.loading = set()
+        self.failed = set()
+        self.events = deque(maxlen=EVENT_HISTORY)
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.shadow_queue = queue.Queue(maxsize=SHADOW_QUEUE_SIZE)
+        self.shadow_thread = None
+        self.shadow_stats = {}
+        self.shadow_flushed = 0.0
+        self.process = uuid.uuid4().hex[:12]
+
+    # Manifest
+
+    def _sync(self):
+        # One stat() per call; the manifest is only parsed again when it changes
+        try:
+            st = os.stat(self.manifest_path)
+            stat = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stat = None
+        if stat != self.manifest_stat:
+            with self.lock:
+                if stat is None:
+                    self.manifest = {'models': {}}
+                else:
+                    with open(self.manifest_path) as f:
+                        self.manifest = json.load(f)
+                self.manifest_stat = stat
+                # A version that failed to load is retried after the next manifest edit
+                self.failed.clear()
+        return self.manifest
+
+    def has(self, name):
+        return self._sync()['models'].get(name, {}).get('active') is not None
+
+    def entry(self, name, version=None):
+        model = self._sync()['models'][name]
+        return model['versions'][version or model['active']]
+
+    def active_version(self, name):
+        return self._sync()['models'][name]['active']
+
+    def shadow_version(self, name):
+        return self._sync()['models'].get(name, {}).get('shadow')
+
+    def serving_sha256(self, name):
+        # Checksum of the version get() returns now; also starts the swap to a new active version,
+        # so that caches keyed on it see the change even when every request is a cache hit
+        active = self.active_version(name)
+        slot = self.serving.get(name)
+        if slot is None:
+            return self.entry(name, active)['sha256']
+        if slot.version != active:
+            self._schedule(self.serving, name, active, 'swap')
+        return slot.sha256
+
+    # Loading and swapping
+
+    def _load(self, name, version, compiled=False):
+        entry = self.entry(name, version)
+        # A forest compiled from exactly this pickle is served in its place
+        model = get_compiled_model(name, entry['sha256']) if compiled else None
+        if model is None:
+            key = f'model:{name}@{version}'
+            registry.register(key, os.path.relpath(os.path.join(self.root, entry['file']), registry.base_dir),
+                              model_loader(name))
+            model = registry.get(key)
+            if registry.digest(key) != entry['sha256']:
+                del registry.resources[key]
+                raise ValueError(f"{name} {version}: checksum does not match the manifest")
+        # One prediction pages the trees in and proves the schema before any user sees the model
+        if entry['features']:
+            import pandas as pd
+            model.predict(pd.DataFrame([[0] * len(entry['features'])], columns=entry['features']))
+        return Slot(version, model, entry['sha256'])
+
+    def _release(self, name, version):
+        # The registry entry of a version no longer served or shadowed is dropped to free its memory
+        in_use = {slot.version for slots in (self.serving, self.shadows, self.bulk)
+                  for n, slot in slots.items() if n == name}
+        if version not in in_use:
+            registry.resources.pop(f'model:{name}@{version}', None)
+
+    def _warm_load(self, slots, name, version, event):
+        start = time.perf_counter()
+        try:
+            slot = self._load(name, version, compiled=USE_COMPILED and slots is self.serving)
+        except Exception as e:
+            with self.lock:
+                self.failed.add((id(slots), name, version))
+                self.events.append(dict(event, status='failed', error=str(e), finished_at=time.time()))
+            return
+        finally:
+            with self.lock:
+                self.loading.discard((id(slots), name, version))
+        old = slots.get(name)
+        slots[name] = slot  # the swap: a single assignment
+        if old is not None and old.version != version:
+            self._release(name, old.version)
+        with self.lock:
+            self.events.append(dict(event, status='ready', seconds=round(time.perf_counter() - start, 3),
+                                    finished_at=time.time()))
+
+    def _schedule(self, slots, name, version, kind):
+        with self.lock:
+            token = (id(slots), name, version)
+            if token in self.loading or token in self.failed:
+                return
+            self.loading.add(token)
+        event = {'model': name, 'version': version, 'kind': kind, 'started_at': time.time()}
+        threading.Thread(target=self._warm_load, args=(slots, name, version, event),
+                         name=f'model-store-{name}-{version}', daemon=True).start()
+
+    def load_active(self, name):
+        # Bulk jobs want the sklearn model of the active version and can wait for it;
+        # it is loaded and checked once per version and kept until the next swap
+        active = self.active_version(name)
+        slot = self.bulk.get(name)
+        if slot is None or slot.version != active:
+            with self.load_lock:
+                slot = self.bulk.get(name)
+                if slot is None or slot.version != active:
+                    old, slot = slot, self._load(name, active)
+                    self.bulk[name] = slot
+                    if old is not None:
+                        self._release(name, old.version)
+        return slot.model
+
+    def get(self, name):
+        active = self.active_version(name)
+        slot = self.serving.get(name)
+        if slot is None:
+            # Nothing to serve in the meantime: the first load happens in the caller
+            with self.load_lock:
+                slot = self.serving.get(name)
+                if slot is None:
+                    slot = self.serving[name] = self._load(name, active, compiled=USE_COMPILED)
+            return slot.model
+        if slot.version != active:
+            self._schedule(self.serving, name, active, 'swap')
+        return slot.model
+
+    def get_shadow(self, name):
+        version = self.shadow_version(name)
+        if version is None or version == self.active_version(name):
+            return None
+        slot = self.shadows.get(name)
+        if slot is None or slot.version != version:
+            self._schedule(self.shadows, name, version, 'shadow')
+            return None
+        return slot
+
+    # Shadow evaluation
+
+    def observe(self, name, X, predictions, seconds):
+        """Queue a live batch for the shadow version; never blocks or raises."""
+        if name not in self.manifest['models'] or self.shadow_version(name) is None:
+            return
+        if SHADOW_SAMPLE < 1.0 and np.random.random() >= SHADOW_SAMPLE:
+            return
+        slot = self.get_shadow(name)
+        if slot is None:
+            return
+        if self.shadow_thread is None:
+            with self.lock:
+                if self.shadow_thread is None:
+                    self.shadow_thread = threading.Thread(target=self._shadow_loop, name='model-store-shadow',
+                                                          daemon=True)
+                    self.shadow_thread.start()
+                    atexit.register(self.flush_shadow_results)
+        serving = self.serving.get(name)
+        active = serving.version if serving is not None else self.active_version(name)
+        try:
+            self.shadow_queue.put_nowait((name, active, slot, X, np.asarray(predictions), seconds))
+        except queue.Full:
+            with self.lock:
+                self._stats(name, active, slot.version)['dropped'] += 1
+
+    def _stats(self, name, active, shadow):
+        # Callers hold self.lock: the shadow thread and request threads both update the counters
+        key = (name, active, shadow)
+        stats = self.shadow_stats.get(key)
+        if stats is None:
+            stats = self.shadow_stats[key] = {'batches': 0, 'predictions': 0, 'agreements': 0,
+                                              'abs_diff_sum': 0.0, 'active_seconds': 0.0,
+                                              'shadow_seconds': 0.0, 'dropped': 0}
+        return stats
+
+    def _shadow_loop(self):
+        while True:
+            name, active, slot, X, predictions, seconds = self.shadow_queue.get()
+            try:
+                start = time.perf_counter()
+                candidate = np.asarray(slot.model.predict(X))
+                shadow_seconds = time.perf_counter() - start
+            except Exception as e:
+                with self.lock:
+                    self.events.append({'model': name, 'version': slot.version, 'kind': 'shadow',
+                                        'status': 'failed', 'error': str(e), 'finished_at': time.time()})
+                continue
+            agreements = int((candidate == predictions).sum())
+            abs_diff = 0.0
+            if np.issubdtype(predictions.dtype, np.number) and np.issubdtype(candidate.dtype, np.number):
+                abs_diff = float(np.abs(candidate.astype(float) - predictions.astype(float)).sum())
+            with self.lock:
+                stats = self._stats(name, active, slot.version)
+                stats['batches'] += 1
+                stats['predictions'] += len(predictions)
+                stats['agreements'] += agreements
+                stats['abs_diff_sum'] += abs_diff
+                stats['active_seconds'] += seconds
+                stats['shadow_seconds'] += shadow_seconds
+            if time.monotonic() - self.shadow_flushed >= SHADOW_FLUSH_SECONDS:
+                self.flush_shadow_results()
+
+    def flush_shadow_results(self, path=ingestion.STORE_PATH):
+        self.shadow_flushed = time.monotonic()
+        with self.lock:
+            rows = [(name, active, shadow, self.process, s['batches'], s['predictions'], s['agreements'],
+                     s['abs_diff_sum'], s['active_seconds'], s['shadow_seconds'], s['dropped'])
+                    for (name, active, shadow), s in self.shadow_stats.items()]
+        if not rows:
+            return
+        conn = ingestion.connect(path)
+        try:
+            conn.executescript(SHADOW_SCHEMA)
+            now = datetime.now().isoformat(timespec='seconds')
+            conn.executemany(
+                'INSERT OR REPLACE INTO shadow_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [row + (now,) for row in rows])
+        finally:
+            conn.close()
+
+    def status(self):
+        models = {}
+        for name, model in self._sync()['models'].items():
+            serving = self.serving.get(name)
+            shadow = self.shadows.get(name)
+            models[name] = {
+                'active': model['active'],
+                'serving': serving.version if serving else None,
+                'shadow': model.get('shadow'),
+                'shadow_loaded': shadow.version if shadow else None,
+                'versions': sorted(model['versions']),
+            }
+        with self.lock:
+            events = list(self.events)[-20:]
+        return {'models': models, 'events': events}
+
+
+# The shared store, created once when this module is first imported
+store = ModelStore()
+
+
+def shadow_report(path=ingestion.STORE_PATH):
+    conn = ingestion.connect(path)
+    try:
+        conn.executescript(SHADOW_SCHEMA)
+        rows = conn.execute(
+            'SELECT model, active_version, shadow_version, SUM(batches), SUM(predictions), SUM(agreements), '
+            'SUM(abs_diff_sum), SUM(active_seconds), SUM(shadow_seconds), SUM(dropped) FROM shadow_results '
+            'GROUP BY model, active_version, shadow_version ORDER BY model, shadow_version').fetchall()
+    finally:
+        conn.close()
+    report = []
+    for name, active, shadow, batches, n, agree, diff, active_s, shadow_s, dropped in rows:
+        report.append({
+            'model': name, 'active': active, 'shadow': shadow, 'batches': batches, 'predictions': n,
+            'agreement': round(agree / n, 4) if n else None,
+            'mean_abs_diff': round(diff / n, 4) if n else None,
+            'active_ms_per_batch': round(active_s / batches * 1e3, 3) if batches else None,
+            'shadow_ms_per_batch': round(shadow_s / batches * 1e3, 3) if batches else None,
+            'dropped': dropped,
+        })
+    return report
+
+
+# Manifest editing (command line)
+
+def _read_manifest(root):
+    path = os.path.join(root, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'models': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(root, manifest):
+    os.makedirs(root, exist_ok=True)
+    tmp_path = os.path.join(root, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(root, MANIFEST_NAME))
+
+
+def register(name, path, version=None, dataset=None, activate=False, root=STORE_DIR):
+    manifest = _read_manifest(root)
+    model_entry = manifest['models'].setdefault(name, {'active': None, 'shadow': None, 'versions': {}})
+    version = version or f"v{len(model_entry['versions']) + 1}"
+    if version in model_entry['versions']:
+        raise ValueError(f"{name} {version} is already registered")
+    schema = model_schema(joblib.load(path))
+    if model_entry['active'] is not None:
+        current = model_entry['versions'][model_entry['active']]
+        if schema['features'] != current['features']:
+            raise ValueError(f"{name} {version} expects features {schema['features']}, "
+                             f"the active version {current['features']}")
+    dataset = dataset or os.path.join(BASE_DIR, DATASET_FILES[TRAINING_DATASETS[name]])
+    relative = os.path.join(name, version, 'model.pkl')
+    os.makedirs(os.path.join(root, name, version), exist_ok=True)
+    shutil.copyfile(path, os.path.join(root, relative))
+    model_entry['versions'][version] = dict(
+        file=relative,
+        sha256=file_digest(os.path.join(root, relative)),
+        source=os.path.basename(path),
+        dataset=os.path.basename(dataset),
+        dataset_sha256=file_digest(dataset),
+        registered_at=datetime.now().isoformat(timespec='seconds'),
+        **schema,
+    )
+    if activate or model_entry['active'] is None:
+        model_entry['active'] = version
+    _write_manifest(root, manifest)
+    return version
+
+
+def init(root=STORE_DIR):
+    # The bundled pickles become v1 of every model not yet in the store
+    registered = []
+    manifest = _read_manifest(root)
+    for name, filename in MODEL_FILES.items():
+        if name not in manifest['models']:
+            registered.append((name, register(name, os.path.join(BASE_DIR, filename), root=root)))
+    return registered
+
+
+def activate(name, version, root=STORE_DIR):
+    manifest = _read_manifest(root)
+    if version not in manifest['models'].get(name, {}).get('versions', {}):
+        raise ValueError(f"{name} {version} is not registered")
+    manifest['models'][name]['active'] = version
+    if manifest['models'][name].get('shadow') == version:
+        manifest['models'][name]['shadow'] = None
+    _write_manifest(root, manifest)
+
+
+def set_shadow(name, version, root=STORE_DIR):
+    manifest = _read_manifest(root)
+    if version is not None and version not in manifest['models'].get(name, {}).get('versions', {}):
+        raise ValueError(f"{name} {version} is not registered")
+    manifest['models'][name]['shadow'] = version
+    _write_manifest(root, manifest)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage versioned model artifacts.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('init', help="register the bundled .pkl files as the first version of each model")
+    reg = commands.add_parser('register', help="add a new version of a model")
+    reg.add_argument('name', choices=list(MODEL_FILES))
+    reg.add_argument('path')
+    reg.add_argument('--version')
+    reg.add_argument('--dataset', help="CSV the model was trained on (default: the bundled dataset)")
+    reg.add_argument('--activate', action='store_true')
+    act = commands.add_parser('activate', help="serve a registered version (running apps swap it in)")
+    act.add_argument('name', choices=list(MODEL_FILES))
+    act.add_argument('version')
+    sh = commands.add_parser('shadow', help="score live traffic with a version in the background")
+    sh.add_argument('name', choices=list(MODEL_FILES))
+    sh.add_argument('version', nargs='?')
+    sh.add_argument('--off', action='store_true')
+    commands.add_parser('list')
+    commands.add_parser('report', help="shadow agreement and latency")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'init':
+            for name, version in init():
+                print(f"Registered {name} {version}")
+        elif args.command == 'register':
+            version = register(args.name, args.path, args.version, args.dataset, args.activate)
+            print(f"Registered {args.name} {version}")
+        elif args.command == 'activate':
+            activate(args.name, args.version)
+            print(f"Activated {args.name} {args.version}")
+        elif args.command == 'shadow':
+            if not args.off and not args.version:
+                parser.error("give a version or --off")
+            set_shadow(args.name, None if args.off else args.version)
+            print(f"Shadow for {args.name}: {'off' if args.off else args.version}")
+        elif args.command == 'list':
+            for name, entry in _read_manifest(STORE_DIR)['models'].items():
+                for version, meta in sorted(entry['versions'].items()):
+                    flags = [f for f, v in (('active', entry['active']), ('shadow', entry.get('shadow')))
+                             if v == version]
+                    print(f"{name:11s} {version:6s} {meta['sha256'][:12]}  data {meta['dataset_sha256'][:12]}  "
+                          f"{meta['estimator']}  {meta['registered_at']}  {' '.join(flags)}")
+        else:
+            for row in shadow_report():
+                print(json.dumps(row))
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
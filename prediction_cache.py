@@ -0,0 +1,112 @@
+# Memoisation of model predictions for repeated inputs.
+#
+# The dashboard widgets are bounded, so the same feature vectors (the default
+# values on every page load, above all) come up again and again. Each cache
+# maps a normalised feature tuple to the prediction, evicts the least recently
+# used entry when full, and is cleared when one of its models changes (a new
+# file on disk or a new version swapped in from the model store).
+#
+# Environment:
+#   WHD_PREDICTION_CACHE_SIZE   entries per model (default: 4096, 0 disables)
+import os
+import threading
+from collections import OrderedDict
+
+from model_registry import model_sha256
+
+DEFAULT_MAXSIZE = int(os.environ.get('WHD_PREDICTION_CACHE_SIZE', 4096))
+
+
+def normalize_row(row):
+    # 1, 1.0 and numpy scalars of the same value share an entry
+    return tuple(float(value) for value in row)
+
+
+class PredictionCache:
+    def __init__(self, name, model_names, maxsize=DEFAULT_MAXSIZE):
+        self.name = name
+        self.model_names = list(model_names)
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    def _check_version(self):
+        # One stat() per model file; the files are only hashed again when they change
+        version = tuple(model_sha256(name) for name in self.model_names)
+        if version != self.version:
+            if self.version is not None:
+                self.invalidations += 1
+            self.entries.clear()
+            self.version = version
+        return version
+
+    def current_version(self):
+        with self.lock:
+            return self._check_version()
+
+    def lookup(self, key):
+        with self.lock:
+            self._check_version()
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return True, self.entries[key]
+            self.misses += 1
+            return False, None
+
+    def store(self, key, value, version=None):
+        # version: the models that produced value, when they ran in another process
+        if self.maxsize <= 0:
+            return
+        with self.lock:
+            if version is not None and tuple(version) != self._check_version():
+                return
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def map(self, batch_fn, rows):
+        """Return batch_fn(rows), calling it only for rows not already cached.
+
+        Uncached rows are scored together in one batch_fn call.
+        """
+        keys = [normalize_row(row) for row in rows]
+        results = [None] * len(rows)
+        missing = {}
+        for i, key in enumerate(keys):
+            found, value = self.lookup(key)
+            if found:
+                results[i] = value
+            else:
+                missing.setdefault(key, []).append(i)
+        if missing:
+            version = self.current_version()
+            scored = batch_fn([rows[positions[0]] for positions in missing.values()])
+            for (key, positions), value in zip(missing.items(), scored):
+                self.store(key, value, version)
+                for i in positions:
+                    results[i] = value
+        return results
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
@@ -0,0 +1,183 @@
+# Headless prediction API for the dashboard models.
+#
+# Requests go through the same InferenceExecutor as the dashboard pages: they
+# are collected into small batches per model (micro-batching) and each batch is
+# scored in a pool of worker processes, so the event loop never blocks on a
+# forest. A full queue is answered with 503 rather than queued without limit.
+#
+# Run:    uvicorn prediction_service:app --host 0.0.0.0 --port 8000
+# Test:   from starlette.testclient import TestClient
+#         with TestClient(prediction_service.app) as client:
+#             client.post('/predict/maternal', json={...})
+#
+# Environment: see inference_executor.py (WHD_WORKERS, WHD_INFERENCE_QUEUE_DEPTH,
+# WHD_MAX_BATCH_SIZE, WHD_MAX_WAIT_MS)
+import asyncio
+import contextlib
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+import predictors
+from inference_executor import InferenceExecutor, InferenceQueueFull
+from instrumentation import metrics as instrumentation_metrics
+
+# (type, min, max) for each input, matching the dashboard widgets
+MATERNAL_FIELDS = {
+    'age': (int, 10, 50),
+    'systolic_bp': (int, 50, 200),
+    'diastolic_bp': (int, 30, 150),
+    'bs': (float, 2.0, 20.0),
+    'body_temp': (float, 80.0, 120.0),
+    'heart_rate': (int, 50, 150),
+}
+MENSTRUAL_FIELDS = {
+    'age': (int, 10, 50),
+    'cycle_length': (int, 20, 40),
+    'cycle_number': (int, 1, 1000),
+}
+MENTAL_HEALTH_FIELDS = {
+    'age': (int, 10, 100),
+}
+
+
+class ValidationError(ValueError):
+    pass
+
+
+def _number(payload, name, kind, low, high, default=None):
+    value = payload.get(name, default)
+    if value is None:
+        raise ValidationError(f"'{name}' is required")
+    try:
+        number = kind(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"'{name}' must be a number")
+    if kind is int and number != value and not isinstance(value, str):
+        raise ValidationError(f"'{name}' must be a whole number")
+    if not low <= number <= high:
+        raise ValidationError(f"'{name}' must be between {low} and {high}")
+    return number
+
+
+def parse_maternal(payload):
+    return [_number(payload, name, *spec) for name, spec in MATERNAL_FIELDS.items()]
+
+
+def parse_menstrual(payload):
+    age = _number(payload, 'age', *MENSTRUAL_FIELDS['age'])
+    cycle_length = _number(payload, 'cycle_length', *MENSTRUAL_FIELDS['cycle_length'])
+    cycle_number = _number(payload, 'cycle_number', *MENSTRUAL_FIELDS['cycle_number'], default=1)
+    try:
+        start_date = date.fromisoformat(str(payload.get('cycle_start_date')))
+    except ValueError:
+        raise ValidationError("'cycle_start_date' must be a date in YYYY-MM-DD format")
+    if not 2000 <= start_date.year <= 2100:
+        raise ValidationError("'cycle_start_date' must be between 2000 and 2100")
+    return predictors.menstrual_features(age, cycle_length, start_date, cycle_number)
+
+
+def parse_mental_health(payload):
+    age = _number(payload, 'age', *MENTAL_HEALTH_FIELDS['age'])
+    answers = {}
+    for name, choices in predictors.MENTAL_HEALTH_CHOICES.items():
+        answer = payload.get(name)
+        if answer not in choices:
+            raise ValidationError(f"'{name}' must be one of {choices}")
+        answers[name] = answer
+    return predictors.encode_mental_health_inputs(age, **answers)
+
+
+async def _read_json(request):
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise ValidationError("Request body must be valid JSON")
+    if not isinstance(payload, dict):
+        raise ValidationError("Request body must be a JSON object")
+    return payload
+
+
+async def _predict(request, name, row):
+    # Repeated inputs are answered from the cache without a trip to the workers
+    future = request.app.state.executor.submit(name, row, timeout=0)
+    return await asyncio.wrap_future(future)
+
+
+async def predict_maternal(request):
+    row = parse_maternal(await _read_json(request))
+    risk_level = await _predict(request, 'maternal', row)
+    return JSONResponse({'risk_level': risk_level,
+                         'recommendation': predictors.get_maternal_recommendation(risk_level)})
+
+
+async def predict_menstrual(request):
+    row = parse_menstrual(await _read_json(request))
+    result = await _predict(request, 'menstrual', row)
+    return JSONResponse({'regular': result['regular'],
+                         'ovulation_date': result['ovulation_date'].strftime('%Y-%m-%d'),
+                         'next_cycle_date': result['next_cycle_date'].strftime('%Y-%m-%d')})
+
+
+async def predict_mental_health(request):
+    row = parse_mental_health(await _read_json(request))
+    prediction = await _predict(request, 'mental_health', row)
+    return JSONResponse({'prediction': prediction})
+
+
+async def health(request):
+    return JSONResponse({'status': 'ok', 'workers': request.app.state.executor.workers})
+
+
+async def metrics(request):
+    state = request.app.state
+    executor = state.executor.metrics()
+    return JSONResponse({
+        'uptime_seconds': round(time.time() - state.started_at, 1),
+        'workers': executor['workers'],
+        'pool_restarts': executor['pool_restarts'],
+        'models': executor['models'],
+        'prediction_cache': predictors.prediction_cache_stats(),
+    })
+
+
+async def prometheus_metrics(request):
+    return PlainTextResponse(instrumentation_metrics.prometheus_text(), media_type='text/plain; version=0.0.4')
+
+
+async def validation_error(request, exc):
+    return JSONResponse({'error': str(exc)}, status_code=422)
+
+
+async def unavailable(request, exc):
+    # The queue is full, or the batch was lost to a dead worker (the pool is already replaced)
+    return JSONResponse({'error': str(exc) or type(exc).__name__}, status_code=503, headers={'Retry-After': '1'})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    app.state.executor = InferenceExecutor()
+    app.state.started_at = time.time()
+    try:
+        yield
+    finally:
+        app.state.executor.shutdown()
+
+
+app = Starlette(
+    routes=[
+        Route('/predict/maternal', predict_maternal, methods=['POST']),
+        Route('/predict/menstrual', predict_menstrual, methods=['POST']),
+        Route('/predict/mental-health', predict_mental_health, methods=['POST']),
+        Route('/health', health),
+        Route('/metrics', metrics),
+        Route('/metrics/prometheus', prometheus_metrics),
+    ],
+    exception_handlers={ValidationError: validation_error, InferenceQueueFull: unavailable,
+                        BrokenProcessPool: unavailable},
+    lifespan=lifespan,
+)
@@ -0,0 +1,202 @@
+# Prediction helpers shared by the dashboard pages, the batch tools and the
+# prediction service. Nothing here depends on Streamlit.
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from instrumentation import timed
+from model_registry import get_model, observe_prediction
+from prediction_cache import PredictionCache
+
+# Feature columns expected by maternal_health_model, in training order
+MATERNAL_FEATURES = ['Age', 'SystolicBP', 'DiastolicBP', 'BS', 'BodyTemp', 'HeartRate']
+
+RISK_LEVELS = {0: 'Low Risk', 1: 'Mid Risk', 2: 'High Risk'}
+
+MATERNAL_RECOMMENDATIONS = {
+    'Low Risk': "Maintain a healthy lifestyle. Regular check-ups are recommended.",
+    'Mid Risk': "Monitor your health closely. Consult a doctor if symptoms worsen.",
+    'High Risk': "Seek immediate medical attention. Follow your doctor’s advice.",
+}
+
+# Feature columns expected by model_regularity and model_ovulation
+MENSTRUAL_FEATURES = ['age', 'cycle_number', 'cycle_length', 'cycle_start_day', 'cycle_start_month',
+                      'cycle_start_year']
+
+# Answers offered on the Mental Well-being page
+MENTAL_HEALTH_CHOICES = {
+    'family_history': ['No', 'Yes'],
+    'work_interfere': ['Never', 'Rarely', 'Sometimes', 'Often'],
+    'benefits': ['No', 'Yes'],
+    'seek_help': ['No', 'Yes'],
+    'anonymity': ['No', 'Yes'],
+    'mental_health_consequence': ['No', 'Yes'],
+}
+
+# One-hot columns expected by mental_health_model, in training order
+MENTAL_HEALTH_FEATURES = [
+    'Age', 'family_history_Yes', 'work_interfere_Often', 'work_interfere_Rarely', 'work_interfere_Sometimes',
+    'benefits_No', 'benefits_Yes', 'seek_help_No', 'seek_help_Yes', 'anonymity_No', 'anonymity_Yes',
+    'mental_health_consequence_No', 'mental_health_consequence_Yes',
+]
+
+# (survey column, answer) behind each one-hot column, e.g. ('work_interfere', 'Often')
+MENTAL_HEALTH_ONE_HOT = [tuple(feature.rsplit('_', 1)) for feature in MENTAL_HEALTH_FEATURES[1:]]
+
+# Columns each model must have been fitted on, checked by model_registry when it loads the model
+MODEL_FEATURES = {
+    'maternal': MATERNAL_FEATURES,
+    'regularity': MENSTRUAL_FEATURES,
+    'ovulation': MENSTRUAL_FEATURES,
+    'mental': MENTAL_HEALTH_FEATURES,
+}
+
+
+# Define prediction functions for maternal health
+def predict_risk(age, systolic_bp, diastolic_bp, bs, body_temp, heart_rate):
+    return predict_risk_batch([[age, systolic_bp, diastolic_bp, bs, body_temp, heart_rate]])[0]
+
+
+def get_maternal_recommendation(risk_level):
+    if risk_level == 'Low Risk':
+        return MATERNAL_RECOMMENDATIONS['Low Risk']
+    elif risk_level == 'Mid Risk':
+        return MATERNAL_RECOMMENDATIONS['Mid Risk']
+    else:
+        return MATERNAL_RECOMMENDATIONS['High Risk']
+
+
+# Function to calculate the next cycle date
+def calculate_next_cycle_date(start_date, cycle_length):
+    return start_date + timedelta(days=cycle_length)
+
+
+def menstrual_features(age, cycle_length, start_date, cycle_number=1):
+    return [age, cycle_number, cycle_length, start_date.day, start_date.month, start_date.year]
+
+
+def predict_cycle(age, cycle_length, start_date, cycle_number=1):
+    return predict_cycle_batch([menstrual_features(age, cycle_length, start_date, cycle_number)])[0]
+
+
+def encode_mental_health_inputs(age, family_history, work_interfere, benefits, seek_help, anonymity,
+                                mental_health_consequence):
+    # One-hot encode the answers the same way the training notebook did
+    with timed('whd_encode_seconds', encoder='mental_health'):
+        answers = {
+            'family_history': family_history,
+            'work_interfere': work_interfere,
+            'benefits': benefits,
+            'seek_help': seek_help,
+            'anonymity': anonymity,
+            'mental_health_consequence': mental_health_consequence,
+        }
+        return [age] + [1 if answers[column] == category else 0 for column, category in MENTAL_HEALTH_ONE_HOT]
+
+
+def encode_mental_health_frame(frame):
+    """Encode raw survey answers (one respondent per row) into MENTAL_HEALTH_FEATURES.
+
+    Answers are compared after stripping whitespace; missing answers and
+    categories the model was not trained on encode as all zeros, as they do
+    on the Mental Well-being page. Age is coerced to a number (NaN if invalid).
+    """
+    columns = ['Age'] + list(MENTAL_HEALTH_CHOICES)
+    missing = [c for c in columns if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+    with timed('whd_encode_seconds', encoder='mental_health_frame'):
+        encoded = {'Age': pd.to_numeric(frame['Age'], errors='coerce')}
+        answers = {column: frame[column].astype('string').str.strip() for column in MENTAL_HEALTH_CHOICES}
+        for feature, (column, category) in zip(MENTAL_HEALTH_FEATURES[1:], MENTAL_HEALTH_ONE_HOT):
+            encoded[feature] = answers[column].eq(category).fillna(False).astype('int64')
+        return pd.DataFrame(encoded, index=frame.index)[MENTAL_HEALTH_FEATURES]
+
+
+def predict_mental_health(age, family_history, work_interfere, benefits, seek_help, anonymity,
+                          mental_health_consequence):
+    row = encode_mental_health_inputs(age, family_history, work_interfere, benefits, seek_help, anonymity,
+                                      mental_health_consequence)
+    return predict_mental_health_batch([row])[0]
+
+
+# Batch versions take lists of feature rows (in the column order above) and
+# make one model call per batch for the rows not already in the prediction
+# cache. They are module-level functions so they can be sent to worker processes.
+PREDICTION_CACHES = {
+    'maternal': PredictionCache('maternal', ['maternal']),
+    'menstrual': PredictionCache('menstrual', ['regularity', 'ovulation']),
+    'mental_health': PredictionCache('mental_health', ['mental']),
+}
+
+
+def predict_risk_batch(rows):
+    return PREDICTION_CACHES['maternal'].map(_predict_risk_uncached, rows)
+
+
+def predict_cycle_batch(rows):
+    return PREDICTION_CACHES['menstrual'].map(_predict_cycle_uncached, rows)
+
+
+def predict_mental_health_batch(rows):
+    return PREDICTION_CACHES['mental_health'].map(_predict_mental_health_uncached, rows)
+
+
+def prediction_cache_stats():
+    return {name: cache.stats() for name, cache in PREDICTION_CACHES.items()}
+
+
+BATCH_FUNCTIONS = {
+    'maternal': predict_risk_batch,
+    'menstrual': predict_cycle_batch,
+    'mental_health': predict_mental_health_batch,
+}
+
+
+def score_batch(name, rows):
+    # For worker processes: the results plus the model versions that produced them,
+    # so the parent only caches results of the versions it serves itself
+    version = PREDICTION_CACHES[name].current_version()
+    return BATCH_FUNCTIONS[name](rows), version
+
+
+def _predict(name, input_data):
+    model = get_model(name)
+    start = time.perf_counter()
+    predictions = model.predict(input_data)
+    observe_prediction(name, input_data, predictions, time.perf_counter() - start)
+    return predictions
+
+
+def _predict_risk_uncached(rows):
+    input_data = pd.DataFrame(rows, columns=MATERNAL_FEATURES)
+    predictions = _predict('maternal', input_data)
+    return [RISK_LEVELS[p] for p in predictions]
+
+
+def _predict_cycle_uncached(rows):
+    input_data = pd.DataFrame(rows, columns=MENSTRUAL_FEATURES)
+    regularity = _predict('regularity', input_data)
+    ovulation = _predict('ovulation', input_data)
+    results = []
+    for row, regular, ovulation_days in zip(rows, regularity, ovulation):
+        start_date = datetime(year=int(row[5]), month=int(row[4]), day=int(row[3]))
+        next_cycle_date = calculate_next_cycle_date(start_date, int(row[2]))
+        results.append({
+            'regular': bool(regular == 1),
+            'ovulation_date': next_cycle_date - timedelta(days=float(ovulation_days)),
+            'next_cycle_date': next_cycle_date,
+        })
+    return results
+
+
+def _predict_mental_health_uncached(rows):
+    input_data = pd.DataFrame(rows, columns=MENTAL_HEALTH_FEATURES)
+    return [str(p) for p in _predict('mental', input_data)]
+
+
+def warm_up():
+    # Load every model so the first request does not pay for unpickling
+    for name in ('maternal', 'regularity', 'ovulation', 'mental'):
+        get_model(name)
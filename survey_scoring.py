@@ -0,0 +1,153 @@
+# Population-scale scoring of survey exports with the mental-health model.
+#
+# Scores a CSV or DataFrame shaped like 'survey.csv' in chunks: the raw answers
+# are one-hot encoded in one vectorised pass per chunk (predictors.
+# encode_mental_health_frame), each chunk goes through a single predict_proba
+# call, and per-country and per-age-band aggregates are accumulated on the way.
+#
+# Command line:
+#   python survey_scoring.py                                  # the bundled survey.csv
+#   python survey_scoring.py export.csv -o scored.csv --aggregates-dir reports/
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from batch_scoring import DEFAULT_CHUNKSIZE, iter_chunks
+from model_registry import BASE_DIR, DATASET_FILES, get_model
+from predictors import encode_mental_health_frame
+
+# Ages accepted on the Mental Well-being page; anything else is not scored
+MIN_AGE, MAX_AGE = 10, 100
+
+AGE_BANDS = [10, 20, 30, 40, 50, 60, MAX_AGE + 1]
+AGE_BAND_LABELS = ['10-19', '20-29', '30-39', '40-49', '50-59', '60+']
+
+COUNT_COLUMNS = ['respondents', 'scored', 'predicted_yes', 'p_yes_sum', 'reported_treatment', 'reported_yes']
+AGGREGATE_COLUMNS = ['respondents', 'scored', 'predicted_yes', 'predicted_yes_rate', 'mean_p_yes', 'reported_yes_rate']
+
+
+def score_survey_chunk(chunk, model=None):
+    model = model if model is not None else get_model('mental', compiled=False)
+    features = encode_mental_health_frame(chunk)
+    valid = features['Age'].between(MIN_AGE, MAX_AGE).to_numpy()
+
+    scored = chunk.copy()
+    labels = np.full(len(chunk), 'Invalid input', dtype=object)
+    p_yes = np.full(len(chunk), np.nan)
+    if valid.any():
+        probabilities = model.predict_proba(features[valid])
+        # Same rule as RandomForestClassifier.predict: the most probable class
+        labels[valid] = model.classes_.take(np.argmax(probabilities, axis=1))
+        p_yes[valid] = probabilities[:, list(model.classes_).index('Yes')]
+    scored['PredictedTreatment'] = labels
+    scored['P(Yes)'] = p_yes
+    scored['AgeBand'] = pd.cut(features['Age'].where(valid), AGE_BANDS, right=False, labels=AGE_BAND_LABELS)
+    return scored
+
+
+def _chunk_aggregates(scored, by):
+    valid = scored['PredictedTreatment'] != 'Invalid input'
+    reported = scored['treatment'].astype('string').str.strip() if 'treatment' in scored else None
+    frame = pd.DataFrame({
+        'key': scored[by].astype('string').str.strip().fillna('Unknown'),
+        'respondents': 1,
+        'scored': valid.astype('int64'),
+        'predicted_yes': (scored['PredictedTreatment'] == 'Yes').astype('int64'),
+        'p_yes_sum': scored['P(Yes)'].fillna(0.0),
+        'reported_treatment': reported.isin(['Yes', 'No']).astype('int64') if reported is not None else 0,
+        'reported_yes': reported.eq('Yes').fillna(False).astype('int64') if reported is not None else 0,
+    })
+    return frame.groupby('key', sort=False)[COUNT_COLUMNS].sum()
+
+
+def _add(total, part):
+    return part if total is None else total.add(part, fill_value=0)
+
+
+def finish_aggregates(counts, name):
+    if counts is None:
+        return pd.DataFrame(columns=[name] + AGGREGATE_COLUMNS)
+    counts = counts.astype({c: 'int64' for c in COUNT_COLUMNS if c != 'p_yes_sum'})
+    scored = counts['scored'].where(counts['scored'] > 0)
+    reported = counts['reported_treatment'].where(counts['reported_treatment'] > 0)
+    result = pd.DataFrame({
+        'respondents': counts['respondents'],
+        'scored': counts['scored'],
+        'predicted_yes': counts['predicted_yes'],
+        'predicted_yes_rate': (counts['predicted_yes'] / scored).round(4),
+        'mean_p_yes': (counts['p_yes_sum'] / scored).round(4),
+        'reported_yes_rate': (counts['reported_yes'] / reported).round(4),
+    })
+    result.index.name = name
+    return result.reset_index().sort_values(['respondents', name], ascending=[False, True]).reset_index(drop=True)
+
+
+def score_survey_batch(source, chunksize=DEFAULT_CHUNKSIZE, stats=None, aggregates=None):
+    """Yield scored DataFrames chunk by chunk.
+
+    If a dict is passed as stats it is updated with rows, invalid_rows,
+    seconds and rows_per_second; if a dict is passed as aggregates it ends up
+    with 'country' and 'age_band' DataFrames once the generator is exhausted.
+    """
+    model = get_model('mental', compiled=False)
+    stats = stats if stats is not None else {}
+    stats.update(rows=0, invalid_rows=0, seconds=0.0, rows_per_second=0.0)
+    by_country = by_age_band = None
+    start = time.perf_counter()
+    columns = None
+    for chunk in iter_chunks(source, chunksize):
+        if columns is None:
+            columns = [str(c).strip() for c in chunk.columns]
+        chunk.columns = columns
+        scored = score_survey_chunk(chunk, model)
+        if 'Country' in scored:
+            by_country = _add(by_country, _chunk_aggregates(scored, 'Country'))
+        valid_ages = scored[scored['AgeBand'].notna()]
+        if len(valid_ages):
+            by_age_band = _add(by_age_band, _chunk_aggregates(valid_ages, 'AgeBand'))
+        stats['rows'] += len(scored)
+        stats['invalid_rows'] += int((scored['PredictedTreatment'] == 'Invalid input').sum())
+        stats['seconds'] = time.perf_counter() - start
+        stats['rows_per_second'] = stats['rows'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+        yield scored
+    if aggregates is not None:
+        aggregates['country'] = finish_aggregates(by_country, 'Country')
+        age_band = finish_aggregates(by_age_band, 'AgeBand')
+        order = {label: i for i, label in enumerate(AGE_BAND_LABELS)}
+        aggregates['age_band'] = age_band.sort_values('AgeBand', key=lambda s: s.map(order)).reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score survey responses with the mental-health model in bulk.")
+    parser.add_argument('input', nargs='?', default=os.path.join(BASE_DIR, DATASET_FILES['survey']),
+                        help="CSV with the columns of 'survey.csv' (default: the bundled survey.csv)")
+    parser.add_argument('-o', '--output', help="also write every scored response to this CSV")
+    parser.add_argument('--aggregates-dir', default='.',
+                        help="where survey_by_country.csv and survey_by_age_band.csv are written")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    stats, aggregates = {}, {}
+    out = open(args.output, 'w', newline='') if args.output else None
+    try:
+        header = True
+        for scored in score_survey_batch(args.input, args.chunksize, stats, aggregates):
+            if out is not None:
+                scored.to_csv(out, header=header, index=False)
+                header = False
+    finally:
+        if out is not None:
+            out.close()
+    os.makedirs(args.aggregates_dir, exist_ok=True)
+    aggregates['country'].to_csv(os.path.join(args.aggregates_dir, 'survey_by_country.csv'), index=False)
+    aggregates['age_band'].to_csv(os.path.join(args.aggregates_dir, 'survey_by_age_band.csv'), index=False)
+    print(f"Scored {stats['rows']} responses ({stats['invalid_rows']} invalid) in {stats['seconds']:.2f}s "
+          f"- {stats['rows_per_second']:.0f} rows/second", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# Compiled forests must predict exactly what the sklearn models predict.
+import os
+
+import numpy as np
+import pytest
+
+import forest_compiler
+
+
+@pytest.fixture
+def compiled_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(forest_compiler, 'COMPILED_DIR', str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.parametrize('name', forest_compiler.FOREST_MODELS)
+def test_compiled_forest_matches_sklearn(name, compiled_dir):
+    forest = forest_compiler._sklearn_model(name)
+    out_dir = forest_compiler.export_forest(name, forest)
+    compiled = forest_compiler.load_compiled_forest(os.path.join(out_dir, 'meta.json'))
+    X = forest_compiler._check_inputs(name, n_random=5000)
+
+    np.testing.assert_array_equal(compiled.predict_proba(X), forest.predict_proba(X))
+    np.testing.assert_array_equal(compiled.predict(X), forest.predict(X))
+    # Single rows take the same path as the pages
+    np.testing.assert_array_equal(compiled.predict(X.iloc[:1]), forest.predict(X.iloc[:1]))
+
+
+def test_reexport_leaves_mapped_forest_intact(compiled_dir):
+    name = forest_compiler.FOREST_MODELS[0]
+    forest = forest_compiler._sklearn_model(name)
+    X = forest_compiler._check_inputs(name, n_random=500)
+    out_dir = forest_compiler.export_forest(name, forest)
+    mapped = forest_compiler.load_compiled_forest(os.path.join(out_dir, 'meta.json'))
+    expected = forest.predict_proba(X)
+
+    # Re-export a different forest over the one still memory-mapped above
+    forest.estimators_ = forest.estimators_[:1]
+    forest_compiler.export_forest(name, forest)
+
+    np.testing.assert_array_equal(mapped.predict_proba(X), expected)
+    reloaded = forest_compiler.load_compiled_forest(os.path.join(out_dir, 'meta.json'))
+    assert reloaded.meta['n_trees'] == 1
+    np.testing.assert_array_equal(reloaded.predict(X), forest.predict(X))
+    assert sorted(os.listdir(compiled_dir)) == [name]
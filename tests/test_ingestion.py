@@ -0,0 +1,34 @@
+# ingestion.py --rebuild must only touch the ingested tables of the shared store.
+from datetime import date
+
+import cycle_forecast
+import health_log
+import ingestion
+
+
+def test_rebuild_keeps_user_logs(tmp_path):
+    store = str(tmp_path / 'health_data.sqlite')
+    ingestion.main(['--store', store])
+    health_log.log_water('u1', 250, path=store)
+    health_log.log_bmi('u1', 1.65, 60.0, path=store)
+    health_log.set_reminder('u1', 60, path=store)
+    cycle_forecast.log_cycle('u1', date(2024, 1, 3), 30, 28, path=store)
+    cycle_forecast.log_cycle('u1', date(2024, 1, 31), 30, path=store)
+    cycle_forecast.save_forecasts(cycle_forecast.forecast_cycles(cycle_forecast.user_history(path=store)),
+                                  path=store)
+
+    ingestion.main(['--store', store, '--rebuild'])
+
+    conn = ingestion.connect(store)
+    try:
+        counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                  for table in ['hydration_log', 'bmi_log', 'reminders', 'user_cycles', 'cycle_forecasts',
+                                'maternal', 'menstrual', 'survey']}
+    finally:
+        conn.close()
+    assert counts['hydration_log'] == 1 and counts['bmi_log'] == 1 and counts['reminders'] == 1
+    assert counts['user_cycles'] == 2 and counts['cycle_forecasts'] == 4
+    assert counts['maternal'] and counts['menstrual'] and counts['survey']
+    # The schema is still there for a process that created it before the rebuild
+    health_log.log_water('u1', 500, path=store)
+    assert health_log.summaries('u1', 'water_ml', path=store)['day']['total'] == 750
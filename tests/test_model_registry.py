@@ -0,0 +1,23 @@
+# Models are checked against the encoders in predictors.py when they are loaded.
+import joblib
+import pandas as pd
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+import model_registry
+from predictors import MENTAL_HEALTH_FEATURES
+
+
+def test_bundled_models_match_the_encoders():
+    for name in model_registry.MODEL_FILES:
+        model_registry.registry.get('model:' + name)
+
+
+def test_mismatched_model_is_rejected_on_load(tmp_path):
+    columns = MENTAL_HEALTH_FEATURES[:-1]
+    model = DecisionTreeClassifier().fit(pd.DataFrame([[0] * len(columns)], columns=columns), ['No'])
+    path = tmp_path / 'mental.pkl'
+    joblib.dump(model, path)
+
+    with pytest.raises(ValueError, match='mental_health_consequence_Yes'):
+        model_registry.model_loader('mental')(str(path))
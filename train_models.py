@@ -0,0 +1,250 @@
+# Reproducible training pipeline for the four models (replaces the notebooks).
+#
+# Each model is trained on its bundled CSV with a cross-validated grid search
+# that runs its fits in parallel on every core. Feature matrices are built once
+# per dataset version and cached under .cache/features/. Of the forests whose
+# CV accuracy is within --tolerance of the best one, the cheapest to run wins:
+# fewest trees, then the shallowest. Inference cost grows with the number of
+# trees and their depth. The same seed is used everywhere, so a rerun on the
+# same data gives the same models.
+#
+# Command line:
+#   python train_models.py                                # all models -> trained_models/
+#   python train_models.py maternal mental --tolerance 0.02
+#   python train_models.py --register --activate          # new versions in model_store/
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import accuracy_score, mean_absolute_error
+from sklearn.model_selection import GridSearchCV, KFold, StratifiedKFold, train_test_split
+
+from model_registry import BASE_DIR, DATASET_FILES, MODEL_FILES, cached_file_digest
+from predictors import MATERNAL_FEATURES, MENSTRUAL_FEATURES, MENTAL_HEALTH_CHOICES, encode_mental_health_frame
+
+OUTPUT_DIR = os.path.join(BASE_DIR, 'trained_models')
+FEATURE_CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'features')
+
+# Bump when a feature builder changes so old cache files are ignored
+FEATURES_VERSION = 1
+
+SEED = 42
+TEST_SIZE = 0.2
+DEFAULT_TOLERANCE = 0.01
+DEFAULT_FOLDS = 5
+
+FOREST_GRID = {
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [None, 8, 12],
+    'min_samples_leaf': [1, 2],
+}
+
+# Regular cycles as labelled in the bundled regularity model
+REGULAR_CYCLE_DAYS = (21, 35)
+# The ovulation model predicts days from ovulation to the next cycle
+LUTEAL_PHASE_DAYS = 14
+
+
+def maternal_features(data):
+    y = data['RiskLevel'].str.strip().str.lower().map({'low risk': 0, 'mid risk': 1, 'high risk': 2})
+    return data[MATERNAL_FEATURES], {'maternal': y}
+
+
+def menstrual_features(data):
+    data = data.dropna(subset=['cycle_length'])
+    start = pd.to_datetime(data['cycle_start_date'], format='%m/%d/%y')
+    X = pd.DataFrame({
+        'age': data['age'],
+        'cycle_number': data['cycle_number'],
+        'cycle_length': data['cycle_length'],
+        'cycle_start_day': start.dt.day,
+        'cycle_start_month': start.dt.month,
+        'cycle_start_year': start.dt.year,
+    })[MENSTRUAL_FEATURES]
+    regular = data['cycle_length'].between(*REGULAR_CYCLE_DAYS).astype('int64')
+    return X, {'regularity': regular, 'ovulation': data['cycle_length'] - LUTEAL_PHASE_DAYS}
+
+
+def survey_features(data):
+    # Women only, as in mental_health.ipynb
+    data = data[data['Gender'].str.contains('Female', case=False, na=False)]
+    data = data[['Age'] + list(MENTAL_HEALTH_CHOICES) + ['treatment']].dropna()
+    return encode_mental_health_frame(data), {'mental': data['treatment'].str.strip()}
+
+
+FEATURE_BUILDERS = {'maternal': maternal_features, 'menstrual': menstrual_features, 'survey': survey_features}
+
+# name: (dataset, estimator, parameter grid, CV scoring)
+MODELS = {
+    'maternal': ('maternal', RandomForestClassifier, FOREST_GRID, 'accuracy'),
+    'regularity': ('menstrual', RandomForestClassifier, FOREST_GRID, 'accuracy'),
+    'ovulation': ('menstrual', LinearRegression, {'fit_intercept': [True]}, 'neg_mean_absolute_error'),
+    'mental': ('survey', RandomForestClassifier, FOREST_GRID, 'accuracy'),
+}
+
+
+def load_features(dataset):
+    """Return (X, {model name: y}) for a bundled dataset, from the cache when it is current."""
+    path = os.path.join(BASE_DIR, DATASET_FILES[dataset])
+    key = f'{cached_file_digest(path)[:16]}-v{FEATURES_VERSION}'
+    cache_path = os.path.join(FEATURE_CACHE_DIR, f'{dataset}-{key}.joblib')
+    if os.path.exists(cache_path):
+        return joblib.load(cache_path)
+    features = FEATURE_BUILDERS[dataset](pd.read_csv(path, encoding='utf-8-sig'))
+    os.makedirs(FEATURE_CACHE_DIR, exist_ok=True)
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    joblib.dump(features, tmp_path)
+    os.replace(tmp_path, cache_path)
+    return features
+
+
+def _cost(params):
+    # Trees first, then depth (unbounded counts as deepest), then bigger leaves
+    depth = params.get('max_depth')
+    return (params.get('n_estimators', 0), float('inf') if depth is None else depth,
+            -params.get('min_samples_leaf', 1))
+
+
+def cheapest_within(tolerance):
+    """refit= rule for GridSearchCV: the cheapest candidate scoring within tolerance of the best."""
+    def refit(cv_results):
+        scores = np.asarray(cv_results['mean_test_score'])
+        best = np.nanmax(scores)
+        candidates = [i for i, score in enumerate(scores) if score >= best - tolerance]
+        return min(candidates, key=lambda i: (_cost(cv_results['params'][i]), -scores[i]))
+    return refit
+
+
+def forest_size(model):
+    if not hasattr(model, 'estimators_'):
+        return {'n_trees': 0, 'n_nodes': 0, 'max_depth': 0}
+    return {
+        'n_trees': len(model.estimators_),
+        'n_nodes': int(sum(e.tree_.node_count for e in model.estimators_)),
+        'max_depth': int(max(e.tree_.max_depth for e in model.estimators_)),
+    }
+
+
+def _score(model, X, y, scoring):
+    predictions = model.predict(X)
+    if scoring == 'accuracy':
+        return round(float(accuracy_score(y, predictions)), 4)
+    return round(float(mean_absolute_error(y, predictions)), 4)
+
+
+def _row_latency_ms(model, X, repeats=20):
+    row = X.iloc[:1]
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(row)
+        times.append(time.perf_counter() - start)
+    return round(float(np.median(times)) * 1e3, 3)
+
+
+def train(name, tolerance=DEFAULT_TOLERANCE, folds=DEFAULT_FOLDS, n_jobs=-1):
+    """Train one model; returns (fitted model, report dict)."""
+    dataset, estimator, grid, scoring = MODELS[name]
+    start = time.perf_counter()
+    X, targets = load_features(dataset)
+    y = targets[name]
+    feature_seconds = time.perf_counter() - start
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=SEED)
+
+    if estimator is RandomForestClassifier:
+        base, cv = estimator(random_state=SEED), StratifiedKFold(folds, shuffle=True, random_state=SEED)
+    else:
+        base, cv = estimator(), KFold(folds, shuffle=True, random_state=SEED)
+    search = GridSearchCV(base, grid, scoring=scoring, cv=cv, n_jobs=n_jobs, refit=cheapest_within(tolerance))
+    start = time.perf_counter()
+    search.fit(X_train, y_train)
+    search_seconds = time.perf_counter() - start
+
+    model = search.best_estimator_
+    results = search.cv_results_
+    best = int(np.nanargmax(results['mean_test_score']))
+    sign = 1 if scoring == 'accuracy' else -1
+    bundled = joblib.load(os.path.join(BASE_DIR, MODEL_FILES[name]))
+    report = {
+        'model': name,
+        'dataset': DATASET_FILES[dataset],
+        'rows': len(X),
+        'metric': 'accuracy' if scoring == 'accuracy' else 'mae',
+        'params': search.best_params_,
+        'cv_score': round(sign * float(results['mean_test_score'][search.best_index_]), 4),
+        'best_params': results['params'][best],
+        'best_cv_score': round(sign * float(results['mean_test_score'][best]), 4),
+        'candidates': len(results['params']),
+        'test_score': _score(model, X_test, y_test, scoring),
+        'bundled_test_score': _score(bundled, X_test, y_test, scoring),
+        **forest_size(model),
+        'bundled_n_nodes': forest_size(bundled)['n_nodes'],
+        'size_bytes': len(pickle.dumps(model)),
+        'bundled_size_bytes': os.path.getsize(os.path.join(BASE_DIR, MODEL_FILES[name])),
+        'row_latency_ms': _row_latency_ms(model, X_test),
+        'bundled_row_latency_ms': _row_latency_ms(bundled, X_test),
+        'feature_seconds': round(feature_seconds, 3),
+        'search_seconds': round(search_seconds, 3),
+        'refit_seconds': round(float(search.refit_time_), 3),
+    }
+    return model, report
+
+
+def print_report(reports, file=sys.stdout):
+    print(f"{'model':11s} {'metric':8s} {'cv':>7s} {'test':>7s} {'bundled':>8s} {'trees':>6s} {'nodes':>8s} "
+          f"{'bundled':>8s} {'KB':>8s} {'row ms':>7s} {'train s':>8s}  params", file=file)
+    for r in reports:
+        print(f"{r['model']:11s} {r['metric']:8s} {r['cv_score']:7.4f} {r['test_score']:7.4f} "
+              f"{r['bundled_test_score']:8.4f} {r['n_trees']:6d} {r['n_nodes']:8d} {r['bundled_n_nodes']:8d} "
+              f"{r['size_bytes'] / 1024:8.1f} {r['row_latency_ms']:7.3f} {r['search_seconds']:8.2f}  "
+              f"{json.dumps(r['params'])}", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Retrain the dashboard models from the bundled CSVs.")
+    parser.add_argument('models', nargs='*', help=f"any of {', '.join(MODELS)} (default: all four)")
+    parser.add_argument('-o', '--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="CV accuracy a smaller forest may give up (default: %(default)s)")
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS)
+    parser.add_argument('--jobs', type=int, default=-1, help="parallel fits (default: all cores)")
+    parser.add_argument('--register', action='store_true', help="add the models to the model store")
+    parser.add_argument('--activate', action='store_true', help="with --register, serve the new versions")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.models if name not in MODELS]
+    if unknown:
+        parser.error(f"unknown model: {', '.join(unknown)}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    reports = []
+    for name in args.models or list(MODELS):
+        model, report = train(name, args.tolerance, args.folds, args.jobs)
+        path = os.path.join(args.output_dir, f'{name}.pkl')
+        joblib.dump(model, path)
+        report['file'] = os.path.relpath(path, args.output_dir)
+        reports.append(report)
+        print(f"Trained {name} in {report['search_seconds'] + report['refit_seconds']:.1f}s -> {path}",
+              file=sys.stderr)
+    with open(os.path.join(args.output_dir, 'training_report.json'), 'w') as f:
+        json.dump({'tolerance': args.tolerance, 'folds': args.folds, 'seed': SEED, 'models': reports}, f, indent=2)
+    print_report(reports)
+
+    if args.register:
+        import model_store
+        model_store.init()
+        for report in reports:
+            version = model_store.register(report['model'], os.path.join(args.output_dir, report['file']),
+                                           activate=args.activate)
+            print(f"Registered {report['model']} {version}{' (active)' if args.activate else ''}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
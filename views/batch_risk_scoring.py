@@ -0,0 +1,28 @@
+# Batch Risk Scoring page: score an uploaded CSV of screening records
+import pandas as pd
+import streamlit as st
+
+from batch_scoring import score_maternal_batch
+
+
+def render():
+    st.title("🏥 Batch Maternal Risk Scoring")
+    st.write("Upload a CSV of screening records to score them all at once. "
+             "It needs the columns Age, SystolicBP, DiastolicBP, BS, BodyTemp and HeartRate.")
+
+    uploaded_file = st.file_uploader("Upload screening records (CSV)", type=["csv"])
+    if uploaded_file is not None and st.button("Score Records"):
+        stats = {}
+        try:
+            scored = pd.concat(list(score_maternal_batch(uploaded_file, stats=stats)), ignore_index=True)
+        except ValueError as e:
+            st.error(f"Could not score this file: {e}")
+        else:
+            st.success(f"Scored {stats['rows']} records in {stats['seconds']:.2f}s "
+                       f"({stats['rows_per_second']:.0f} rows/second).")
+            if stats['invalid_rows']:
+                st.warning(f"{stats['invalid_rows']} records had missing or non-numeric values and were not scored.")
+            st.write(scored['PredictedRiskLevel'].value_counts())
+            st.dataframe(scored.head(100))
+            st.download_button("Download scored records", scored.to_csv(index=False),
+                               file_name="scored_records.csv", mime="text/csv")
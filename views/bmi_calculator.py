@@ -0,0 +1,95 @@
+# BMI Calculator page
+import streamlit as st
+
+import health_log
+
+
+def render():
+    st.title("📊 BMI Calculator")
+    st.write("Calculate your Body Mass Index (BMI) and get personalized recommendations.")
+
+    # Input fields for height and weight
+    height_unit = st.radio("Select height unit:", ["Centimeters (cm)", "Meters (m)"])
+    if height_unit == "Centimeters (cm)":
+        height = st.number_input("Enter your height (in cm):", min_value=50, max_value=250, value=160)
+        height_m = height / 100  # Convert cm to meters
+    else:
+        height_m = st.number_input("Enter your height (in meters):", min_value=1.0, max_value=2.5, value=1.6)
+
+    weight_unit = st.radio("Select weight unit:", ["Kilograms (kg)", "Pounds (lbs)"])
+    if weight_unit == "Kilograms (kg)":
+        weight = st.number_input("Enter your weight (in kg):", min_value=30, max_value=300, value=60)
+    else:
+        weight_lbs = st.number_input("Enter your weight (in lbs):", min_value=66, max_value=660, value=132)
+        weight = weight_lbs * 0.453592  # Convert lbs to kg
+
+    # Optional log: with a User ID every calculation is kept
+    user_id = st.text_input("User ID (optional, to track your BMI over time)").strip()
+
+    # Calculate BMI
+    if st.button("Calculate BMI"):
+        if height_m <= 0 or weight <= 0:
+            st.error("Please enter valid height and weight values.")
+        else:
+            bmi = weight / (height_m ** 2)
+            st.success(f"Your BMI is: **{bmi:.2f}**")
+            if user_id:
+                health_log.log_bmi(user_id, height_m, weight)
+
+            # BMI Categories and Recommendations
+            if bmi < 18.5:
+                st.warning("**Category:** Underweight")
+                st.write("**Recommendations:**")
+                st.write("- Focus on gaining weight through a balanced diet rich in proteins, healthy fats, and carbohydrates.")
+                st.write("- Include strength training exercises to build muscle mass.")
+                st.write("- Consult a nutritionist for a personalized diet plan.")
+            elif 18.5 <= bmi < 24.9:
+                st.success("**Category:** Normal Weight")
+                st.write("**Recommendations:**")
+                st.write("- Maintain a healthy lifestyle with regular exercise and a balanced diet.")
+                st.write("- Stay hydrated and avoid excessive junk food.")
+                st.write("- Regular health check-ups are recommended.")
+            elif 25 <= bmi < 29.9:
+                st.warning("**Category:** Overweight")
+                st.write("**Recommendations:**")
+                st.write("- Focus on losing weight through a calorie deficit diet and regular exercise.")
+                st.write("- Include more fruits, vegetables, and whole grains in your diet.")
+                st.write("- Avoid sugary drinks and processed foods.")
+            else:
+                st.error("**Category:** Obese")
+                st.write("**Recommendations:**")
+                st.write("- Seek professional help from a doctor or nutritionist for weight management.")
+                st.write("- Incorporate daily physical activity like walking, jogging, or yoga.")
+                st.write("- Avoid high-calorie foods and focus on portion control.")
+
+    if user_id:
+        _history(user_id)
+
+    # Additional Tips
+    st.markdown("### 🍎 Healthy Eating Tips")
+    st.write("- Eat a variety of fruits and vegetables daily.")
+    st.write("- Choose whole grains over refined grains.")
+    st.write("- Limit your intake of added sugars and saturated fats.")
+    st.write("- Stay hydrated by drinking plenty of water.")
+
+    st.markdown("### 🏋️‍♀️ Exercise Tips")
+    st.write("- Aim for at least 30 minutes of moderate exercise daily.")
+    st.write("- Include strength training exercises twice a week.")
+    st.write("- Try activities like yoga, swimming, or cycling for variety.")
+
+
+def _history(user_id):
+    # Monthly rollups, most recent first; the week is read from the weight summaries
+    months = health_log.history(user_id, 'bmi', 'month', limit=2)
+    if not months:
+        return
+    st.markdown("### 📈 Your BMI History")
+    latest, month, change = st.columns(3)
+    latest.metric("Latest BMI", f"{months[0]['last']:.2f}")
+    month.metric(f"Mean BMI ({months[0]['period_start'][:7]})", f"{months[0]['mean']:.2f}")
+    if len(months) == 2:
+        change.metric("Change on the month before", f"{months[0]['mean'] - months[1]['mean']:+.2f}")
+    weight = health_log.summaries(user_id, 'weight_kg')['week']
+    if weight['count']:
+        st.write(f"This week: {weight['count']} measurements, weight "
+                 f"{weight['min']:.1f}-{weight['max']:.1f} kg.")
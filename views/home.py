@@ -0,0 +1,57 @@
+# Home page: welcome text and the filterable analytics charts
+import streamlit as st
+
+from analytics import explorer_chart, get_explorer_cube
+from instrumentation import timed
+
+
+def render():
+    st.title("🌸 Women's Health Dashboard 🌸")
+    st.write("Welcome to the Women's Health Dashboard! Use the sidebar to navigate to different sections.")
+    
+    # Add an image
+    st.image("image1.jpg", caption="Empowering Women Through Health Awareness", use_container_width=True)
+
+    # Data Analytics Section
+    st.header("📊 Data Analytics for Women's Health Awareness")
+
+    # Every filter combination is precomputed once per dataset version (see analytics.py)
+    with timed('whd_home_charts_seconds'):
+        cube = get_explorer_cube()
+    options = cube['options']
+
+    # Maternal Health Analytics
+    st.subheader("1. Maternal Health Risk Analysis")
+    st.write("How each factor contributes to maternal health risk:")
+    left, right = st.columns(2)
+    risk = left.selectbox("Risk level", options['risk'], key='maternal_risk')
+    band = right.selectbox("Age band", options['age_band'], key='maternal_age_band')
+    _chart('maternal_box', explorer_chart(cube, 'maternal', risk, band))
+    st.write("This graph shows the distribution of factors like age, blood pressure, blood sugar, body temperature, and heart rate for the selected maternal health cases.")
+
+    # Menstrual Health Analytics
+    st.subheader("2. Menstrual Health Analysis")
+    st.write("Distribution of Menstrual Cycle Lengths:")
+    left, right = st.columns(2)
+    band = left.selectbox("Age band", options['age_band'], key='cycle_age_band')
+    cycle = right.selectbox("Cycle number", options['cycle'], key='cycle_number')
+    _chart('cycle_hist', explorer_chart(cube, 'menstrual', band, cycle))
+    st.write("This graph shows the distribution of menstrual cycle lengths among women.")
+
+    # Mental Health Analytics
+    st.subheader("3. Mental Health Analysis")
+    st.write("Number of women affected by mental health diseases:")
+    left, middle, right = st.columns(3)
+    country = left.selectbox("Country", options['country'], key='survey_country')
+    band = middle.selectbox("Age band", options['age_band'], key='survey_age_band')
+    gender = right.selectbox("Respondents", options['gender'], key='survey_gender')
+    _chart('treatment_counts', explorer_chart(cube, 'survey', country, band, gender))
+    st.write("This graph shows the number of respondents who sought mental health treatment versus those who did not.")
+
+
+def _chart(name, spec):
+    if spec is None:
+        st.info("No records match these filters.")
+        return
+    with timed('whd_home_chart_render_seconds', chart=name):
+        st.vega_lite_chart(spec=spec, width='stretch')
@@ -0,0 +1,104 @@
+# Hydration Tracker page
+from datetime import time
+
+import streamlit as st
+
+import health_log
+
+REMINDER_MINUTES = {"Every 30 minutes": 30, "Every 1 hour": 60, "Every 2 hours": 120}
+
+
+def render():
+    st.title("💧 Hydration Tracker")
+    st.write("Track your daily water intake and stay hydrated!")
+
+    # Daily Water Intake Recommendation
+    st.markdown("### 🚰 Daily Water Intake Recommendation")
+    weight_kg = st.number_input("Enter your weight (in kg):", min_value=30, max_value=300, value=60)
+    activity_level = st.selectbox("Select your activity level:", ["Sedentary", "Moderately Active", "Very Active"])
+    
+    # Calculate recommended water intake
+    if activity_level == "Sedentary":
+        water_intake_ml = weight_kg * 30  # 30 ml per kg of body weight
+    elif activity_level == "Moderately Active":
+        water_intake_ml = weight_kg * 35  # 35 ml per kg of body weight
+    else:
+        water_intake_ml = weight_kg * 40  # 40 ml per kg of body weight
+
+    st.success(f"Your recommended daily water intake is **{water_intake_ml:.0f} ml**.")
+
+    # Water Intake Tracker
+    st.markdown("### 📊 Track Your Water Intake")
+    st.write("Log how much water you've consumed today:")
+
+    # Optional log: with a User ID every amount is added to today's total
+    user_id = st.text_input("User ID (optional, to keep a daily log)").strip()
+
+    # Input for water intake
+    water_consumed_ml = st.number_input("Enter the amount of water consumed (in ml):", min_value=0, max_value=5000, value=0)
+    if user_id:
+        for reminder in health_log.pending_reminders(user_id):
+            st.info(f"🔔 {reminder['due_at'].strftime('%H:%M')}: {reminder['message']}")
+        if st.button("Add to today's log"):
+            if water_consumed_ml > 0:
+                health_log.log_water(user_id, water_consumed_ml)
+                st.success(f"Logged {water_consumed_ml} ml.")
+            else:
+                st.warning("Enter an amount above 0 ml to add it to your log.")
+        water = health_log.summaries(user_id, 'water_ml')
+        last_week = health_log.rolling(user_id, 'water_ml', days=7)
+        today, this_week, this_month = st.columns(3)
+        today.metric("Today", f"{water['day']['total']:.0f} ml")
+        this_week.metric("7-day average", f"{last_week['daily_mean']:.0f} ml" if last_week['days'] else "-")
+        this_month.metric("This month", f"{water['month']['total'] / 1000:.1f} l")
+        water_consumed_ml = water['day']['total']
+
+    # Calculate remaining water intake
+    remaining_water_ml = max(0, water_intake_ml - water_consumed_ml)
+    st.write(f"Remaining water to drink today: **{remaining_water_ml:.0f} ml**.")
+
+    # Progress Bar
+    progress = min(1.0, water_consumed_ml / water_intake_ml)
+    st.progress(progress)
+    st.write(f"You've consumed **{progress * 100:.1f}%** of your daily goal.")
+
+    # Hydration Tips
+    st.markdown("### 💡 Hydration Tips")
+    st.write("- Start your day with a glass of water.")
+    st.write("- Carry a reusable water bottle with you.")
+    st.write("- Set reminders to drink water throughout the day.")
+    st.write("- Eat water-rich foods like cucumbers, watermelon, and oranges.")
+    st.write("- Avoid sugary drinks and opt for water instead.")
+
+    # Reminder Feature
+    st.markdown("### ⏰ Set a Hydration Reminder")
+    reminder_frequency = st.selectbox("How often would you like to be reminded to drink water?", ["Every 30 minutes", "Every 1 hour", "Every 2 hours"])
+    
+    if user_id:
+        active_from = st.time_input("Remind me from", value=time(8, 0))
+        active_until = st.time_input("Until", value=time(22, 0))
+        if active_from >= active_until:
+            st.error("\"Remind me from\" must be earlier than \"Until\".")
+        elif st.button("Set Reminder"):
+            due = health_log.set_reminder(user_id, REMINDER_MINUTES[reminder_frequency],
+                                          active_from.strftime('%H:%M'), active_until.strftime('%H:%M'),
+                                          goal_ml=water_intake_ml)
+            st.write(f"🔔 Reminder set: {reminder_frequency.lower()}, first at {due.strftime('%H:%M')}. "
+                     "Reminders stop for the day once you reach your goal.")
+        reminder = health_log.get_reminder(user_id)
+        if reminder is not None:
+            st.write(f"Next reminder: **{reminder['next_due'].strftime('%Y-%m-%d %H:%M')}**")
+            if st.button("Stop reminders"):
+                health_log.clear_reminder(user_id)
+                st.rerun()
+        # Reminders are fired by a background thread, not by page reruns
+        health_log.get_scheduler()
+    elif st.button("Set Reminder"):
+        if reminder_frequency == "Every 30 minutes":
+            st.write("🔔 Reminder set: Drink water every 30 minutes!")
+        elif reminder_frequency == "Every 1 hour":
+            st.write("🔔 Reminder set: Drink water every 1 hour!")
+        else:
+            st.write("🔔 Reminder set: Drink water every 2 hours!")
+        st.write("Stay consistent and keep hydrating! 💧")
+        st.caption("Enter a User ID above to get these reminders while the app is open.")
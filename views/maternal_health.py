@@ -0,0 +1,27 @@
+# Maternal Health page: risk prediction from vitals
+import streamlit as st
+
+from inference_executor import get_executor, submit_risk
+from predictors import get_maternal_recommendation
+
+
+def render():
+    # Workers load the models while the form is being filled in
+    get_executor()
+    st.title("🤰 Maternal Health Predictor")
+    st.write("Enter your details to predict maternal health risks.")
+
+    # Input fields
+    age = st.number_input("Age", min_value=10, max_value=50, value=25)
+    systolic_bp = st.number_input("Systolic Blood Pressure", min_value=50, max_value=200, value=120)
+    diastolic_bp = st.number_input("Diastolic Blood Pressure", min_value=30, max_value=150, value=80)
+    bs = st.number_input("Blood Sugar Level", min_value=2.0, max_value=20.0, value=5.0)
+    body_temp = st.number_input("Body Temperature", min_value=80.0, max_value=120.0, value=98.0)
+    heart_rate = st.number_input("Heart Rate", min_value=50, max_value=150, value=80)
+
+    # Predict button
+    if st.button("Predict"):
+        risk_level = submit_risk(age, systolic_bp, diastolic_bp, bs, body_temp, heart_rate).result()
+        recommendation = get_maternal_recommendation(risk_level)
+        st.success(f"Predicted Risk Level: {risk_level}")
+        st.write(f"Recommendation: {recommendation}")
@@ -0,0 +1,116 @@
+# Menstrual Cycle page: regularity, ovulation and next cycle date
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+import cycle_forecast
+from instrumentation import timed
+from inference_executor import get_executor, submit_cycle
+
+
+def render():
+    # Workers load the models while the form is being filled in
+    get_executor()
+    st.title("📅 Menstrual Cycle Predictor")
+    st.write("Enter your details to predict menstrual cycle regularity, ovulation date, and next cycle date.")
+
+    # Input fields
+    age = st.number_input("Age", min_value=10, max_value=50, value=25)
+    cycle_length = st.number_input("Cycle Length (in days)", min_value=20, max_value=40, value=28)
+    cycle_start_day = st.number_input("Cycle Start Day", min_value=1, max_value=31, value=15)
+    cycle_start_month = st.number_input("Cycle Start Month", min_value=1, max_value=12, value=5)
+    cycle_start_year = st.number_input("Cycle Start Year", min_value=2000, max_value=2100, value=2023)
+
+    # Optional history: with a User ID the logged cycles give the real cycle number and rolling length
+    user_id = st.text_input("User ID (optional, to keep a cycle history)").strip()
+    forecast_cycles = st.number_input("Cycles to forecast", min_value=1, max_value=12, value=3)
+    history = cycle_forecast.user_history([user_id]) if user_id else None
+    if user_id:
+        if st.button("Log this cycle"):
+            start_date = datetime(year=cycle_start_year, month=cycle_start_month, day=cycle_start_day)
+            cycle_forecast.log_cycle(user_id, start_date, age, cycle_length)
+            history = cycle_forecast.user_history([user_id])
+            st.success(f"Logged the cycle starting {start_date.strftime('%Y-%m-%d')}.")
+        if len(history):
+            st.write("Your logged cycles:")
+            st.dataframe(history.assign(cycle_start_date=history['cycle_start_date'].dt.strftime('%Y-%m-%d'))
+                         [['cycle_start_date', 'cycle_length', 'age']], hide_index=True)
+
+    # Symptoms dropdown
+    symptoms = st.multiselect(
+        "Select your symptoms",
+        ["Cramps", "Fatigue", "Vomiting/Nausea", "Headache", "Mood Swings", 
+         "Bloating", "Back Pain", "Breast Tenderness", "Food Cravings", "Insomnia"]
+    )
+
+    # Predict button
+    if st.button("Predict"):
+        # Predict regularity, ovulation date and next cycle date
+        start_date = datetime(year=cycle_start_year, month=cycle_start_month, day=cycle_start_day)
+        forecasts = None
+        if history is not None and len(history):
+            # Every step is scored by the shared executor, batched with other sessions' predictions
+            plan = cycle_forecast.plan_cycles(history, forecast_cycles)
+            futures = [submit_cycle(row.age, row.cycle_length, row.cycle_start_date, row.cycle_number)
+                       for row in plan.itertuples(index=False)]
+            with timed('whd_model_predict_seconds', model='cycle_forecast'):
+                results = pd.DataFrame([future.result() for future in futures], index=plan.index)
+            if len(plan):
+                forecasts = plan.join(results)
+                latest = forecasts.iloc[0]
+                st.info(f"Predicted from your {len(history)} logged cycles: cycle {latest['cycle_number']} "
+                        f"starting {latest['cycle_start_date'].strftime('%Y-%m-%d')}, "
+                        f"{latest['cycle_length']} days, age {int(latest['age'])}. The age, cycle length and "
+                        f"start date entered above are not used; log this cycle to include it.")
+            else:
+                st.warning("Your logged cycles have no age recorded, so the details entered above are used.")
+        if forecasts is not None:
+            cycle_prediction = forecasts.iloc[0]
+        else:
+            cycle_prediction = submit_cycle(age, cycle_length, start_date).result()
+        next_cycle_date = cycle_prediction['next_cycle_date']
+        ovulation_date = cycle_prediction['ovulation_date']
+
+        # Display predictions
+        if cycle_prediction['regular']:
+            st.success("Cycle Regularity: It is regular.")
+        else:
+            st.warning("Cycle Regularity: It is irregular. Consult a doctor.")
+
+        st.success(f"Ovulation Date: {ovulation_date.strftime('%Y-%m-%d')}")
+        st.success(f"Next Cycle Date: {next_cycle_date.strftime('%Y-%m-%d')}")
+
+        if forecasts is not None:
+            st.write(f"Forecast for your next {forecast_cycles} cycles:")
+            upcoming = forecasts[forecasts['step'] > 0]
+            st.dataframe(pd.DataFrame({
+                'Cycle': upcoming['cycle_number'],
+                'Start': upcoming['cycle_start_date'].dt.strftime('%Y-%m-%d'),
+                'Length (days)': upcoming['cycle_length'],
+                'Ovulation': upcoming['ovulation_date'].dt.strftime('%Y-%m-%d'),
+                'Regular': upcoming['regular'].map({True: 'Yes', False: 'No'}),
+            }), hide_index=True)
+
+        # Provide recommendations based on symptoms
+        st.write("Recommendations:")
+        if "Cramps" in symptoms:
+            st.write("- **Cramps:** Drink herbal teas like chamomile or ginger. Use a heating pad and practice yoga poses like Child’s Pose.")
+        if "Fatigue" in symptoms:
+            st.write("- **Fatigue:** Get adequate sleep and eat iron-rich foods like spinach and lentils.")
+        if "Vomiting/Nausea" in symptoms:
+            st.write("- **Vomiting/Nausea:** Sip on ginger tea and avoid greasy or spicy foods.")
+        if "Headache" in symptoms:
+            st.write("- **Headache:** Stay hydrated and apply a cold compress to your forehead.")
+        if "Mood Swings" in symptoms:
+            st.write("- **Mood Swings:** Practice mindfulness and eat omega-3-rich foods like salmon.")
+        if "Bloating" in symptoms:
+            st.write("- **Bloating:** Avoid salty foods and drink peppermint tea.")
+        if "Back Pain" in symptoms:
+            st.write("- **Back Pain:** Apply a heating pad and practice gentle yoga poses.")
+        if "Breast Tenderness" in symptoms:
+            st.write("- **Breast Tenderness:** Wear a supportive bra and reduce caffeine intake.")
+        if "Food Cravings" in symptoms:
+            st.write("- **Food Cravings:** Opt for healthy snacks like fruits and nuts.")
+        if "Insomnia" in symptoms:
+            st.write("- **Insomnia:** Establish a bedtime routine and avoid screens before bed.")
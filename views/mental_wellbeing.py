@@ -0,0 +1,39 @@
+# Mental Well-being page: treatment prediction from survey answers
+import streamlit as st
+
+from inference_executor import get_executor, submit_mental_health
+
+
+def render():
+    # Workers load the models while the form is being filled in
+    get_executor()
+    st.title("🧠 Mental Well-being Predictor")
+    st.write("Enter your details to assess your mental well-being.")
+
+    # Input fields
+    age = st.number_input("Age", min_value=10, max_value=100, value=30)
+    family_history = st.selectbox("Do you have a family history of mental health issues?", ["No", "Yes"])
+    work_interfere = st.selectbox("Does work interfere with your mental health?", ["Never", "Rarely", "Sometimes", "Often"])
+    benefits = st.selectbox("Do you have mental health benefits?", ["No", "Yes"])
+    seek_help = st.selectbox("Do you seek help for mental health?", ["No", "Yes"])
+    anonymity = st.selectbox("Is anonymity protected in your mental health programs?", ["No", "Yes"])
+    mental_health_consequence = st.selectbox("Does discussing mental health have consequences at work?", ["No", "Yes"])
+
+    # Predict button
+    if st.button("Predict"):
+        prediction = submit_mental_health(age, family_history, work_interfere, benefits, seek_help,
+                                          anonymity, mental_health_consequence).result()
+        st.success(f"Prediction: {prediction}")
+
+        # Provide recommendations based on prediction
+        if prediction == "Yes":
+            st.warning("Recommendations to Improve Mental Health:")
+            st.write("- **Practice Mindfulness:** Engage in meditation or deep breathing exercises.")
+            st.write("- **Stay Active:** Regular physical activity can improve mood and reduce stress.")
+            st.write("- **Seek Professional Help:** Consider visiting a therapist or counselor for support.")
+            st.write("- **Connect with Others:** Share your feelings with trusted friends or family members.")
+            st.write("- **Maintain a Healthy Lifestyle:** Eat nutritious meals, sleep well, and avoid excessive caffeine or alcohol.")
+        else:
+            st.success("Positive Affirmation:")
+            st.write("- You are doing great! Keep up the good work and continue taking care of your mental health.")
+            st.write("- Remember to practice self-care and stay connected with loved ones.")
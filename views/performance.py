@@ -0,0 +1,81 @@
+# Performance page (admins only): timings collected by instrumentation.py
+import streamlit as st
+
+from inference_executor import current_executor
+from instrumentation import metrics
+from model_store import shadow_report, store
+from predictors import prediction_cache_stats
+
+STAGES = {
+    'whd_resource_load_seconds': "Model and dataset loads",
+    'whd_csv_read_seconds': "CSV ingestion",
+    'whd_home_charts_seconds': "Home chart specs",
+    'whd_home_chart_render_seconds': "Home chart renders",
+    'whd_encode_seconds': "Input encoding",
+    'whd_health_log_seconds': "Hydration and BMI logs",
+    'whd_inference_request_seconds': "Prediction requests (submit to result)",
+}
+
+
+def _rows(name, label_name):
+    rows = []
+    for labels, summary in metrics.summaries(name).items():
+        row = {label_name: ', '.join(str(v) for _, v in labels) or '-'}
+        row.update(summary)
+        rows.append(row)
+    return rows
+
+
+def render():
+    st.title("⏱️ Performance")
+    st.write("Timings collected by this server process since it started (histogram estimates for p50/p95).")
+
+    st.subheader("Page rerun latency")
+    rows = _rows('whd_page_render_seconds', 'page')
+    if rows:
+        st.dataframe(rows, hide_index=True)
+    else:
+        st.info("No pages rendered yet.")
+
+    st.subheader("Model calls")
+    rows = _rows('whd_model_predict_seconds', 'model')
+    executor = current_executor()
+    if executor is not None:
+        counts = executor.metrics()['models']
+        for row in rows:
+            if row['model'] in counts:
+                row['requests'] = counts[row['model']]['requests']
+                row['cache_hits'] = counts[row['model']]['cache_hits']
+    if rows:
+        st.dataframe(rows, hide_index=True)
+    else:
+        st.info("No model calls yet.")
+    st.write("Prediction cache:")
+    st.dataframe([dict(model=name, **stats) for name, stats in prediction_cache_stats().items()], hide_index=True)
+
+    status = store.status()
+    if status['models']:
+        st.subheader("Model versions")
+        st.dataframe([{'model': name, 'active': model['active'], 'serving here': model['serving'] or '-',
+                       'shadow': model['shadow'] or '-', 'versions': ', '.join(model['versions'])}
+                      for name, model in status['models'].items()], hide_index=True)
+        if status['events']:
+            st.write("Loads in this process:")
+            st.dataframe(status['events'], hide_index=True)
+        report = shadow_report()
+        if report:
+            st.write("Shadow evaluation:")
+            st.dataframe(report, hide_index=True)
+
+    st.subheader("Stages")
+    for name, title in STAGES.items():
+        rows = _rows(name, 'label')
+        if rows:
+            st.write(f"{title} (`{name}`):")
+            st.dataframe(rows, hide_index=True)
+
+    st.download_button("Download Prometheus metrics", metrics.prometheus_text(), file_name="whd_metrics.prom",
+                       mime="text/plain")
+    if st.button("Reset timings"):
+        metrics.reset()
+        st.rerun()